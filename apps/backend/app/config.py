@@ -1,29 +1,51 @@
 import os
-from pydantic import BaseSettings
 from typing import Optional
 
-class Settings(BaseSettings):
+# pydantic v2 에서는 BaseSettings 가 별도 패키지(pydantic-settings)로 분리되어, 환경변수를 직접 읽음.
+# .env 는 main.py 에서 한 번 로드됨.
+
+DEFAULT_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../yujin/univ.db"))
+
+
+def database_url(url: Optional[str] = None) -> str:
+    """
+    DATABASE_URL 을 async 드라이버 URL 로 정규화.
+    - 없으면 UNIV_DB_PATH 의 SQLite 파일 (sqlite+aiosqlite)
+    - sqlite:///x -> sqlite+aiosqlite:///x, postgres(ql)://... -> postgresql+asyncpg://...
+    """
+    url = url or os.getenv("DATABASE_URL")
+    if not url:
+        return f"sqlite+aiosqlite:///{os.getenv('UNIV_DB_PATH', DEFAULT_DB_PATH)}"
+    scheme, sep, rest = url.partition("://")
+    if scheme == "sqlite":
+        scheme = "sqlite+aiosqlite"
+    elif scheme in ("postgres", "postgresql"):
+        scheme = "postgresql+asyncpg"
+    return f"{scheme}{sep}{rest}"
+
+
+class Settings:
     # Application settings
     APP_NAME: str = "Frame Gen API"
     APP_VERSION: str = "0.1.0"
     APP_DESCRIPTION: str = "API for Frame Gen application"
-    
+
     # Environment settings
     ENV: str = os.getenv("ENV", "development")
     DEBUG: bool = ENV == "development"
-    
+
     # API settings
     API_PREFIX: str = "/api/v1"
-    
+
     # CORS settings
     CORS_ORIGINS: list = ["*"]
-    
+
     # Database settings
-    DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL", "sqlite:///./app.db")
-    
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    DATABASE_URL: str = database_url()
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
 
 # Create settings instance
-settings = Settings()
\ No newline at end of file
+settings = Settings()
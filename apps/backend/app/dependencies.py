@@ -1,13 +1,33 @@
+from functools import lru_cache
 from fastapi import Depends, HTTPException, status
-from app.services.frame_service import frame_service
-from app.services.gemini_frame_service import gemini_frame_service
+
+# Services are built on first use rather than at import time, so a worker can boot
+# (and serve everything else) even when an optional integration is not configured.
+# lru_cache does not cache exceptions: a failed build is retried on the next request.
+
+@lru_cache(maxsize=None)
+def _gemini_frame_service():
+    from app.services.gemini_frame_service import GeminiFrameService
+    return GeminiFrameService()
 
 # Example dependency to get the frame service
 def get_frame_service():
+    from app.services.frame_service import frame_service
     return frame_service
 
 # Dependency to get the Gemini frame service
 def get_gemini_frame_service():
-    return gemini_frame_service
+    try:
+        return _gemini_frame_service()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Gemini is not configured: {e}")
+
+# Dependency to get the shared R2 (S3) client
+def get_r2_client():
+    from app.services.r2_client import get_s3
+    try:
+        return get_s3()
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"R2 is not configured: {e}")
 
-# Add more dependencies as needed
\ No newline at end of file
+# Add more dependencies as needed
@@ -0,0 +1,4 @@
+# Frame Gen ASGI Middleware
+from app.middleware.upload_limit import UploadSizeLimitMiddleware
+from app.middleware.admission import AdmissionControlMiddleware, render_metrics
+from app.middleware.compression import CompressionMiddleware
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+
+class RouteGroup:
+    """
+    동시 처리 한도를 공유하는 경로 묶음.
+    - limit      : 동시에 처리할 요청 수
+    - max_queue  : 슬롯을 기다릴 수 있는 요청 수 (넘으면 즉시 503)
+    - queue_timeout : 대기열에서 기다리는 최대 시간(초, 넘으면 503)
+    - retry_after   : 503 응답의 Retry-After(초)
+    환경변수 ADMISSION_<NAME>_CONCURRENCY / _QUEUE / _QUEUE_TIMEOUT / _RETRY_AFTER 로 덮어쓸 수 있음.
+    """
+
+    def __init__(self, name: str, prefixes: Iterable[str], limit: int, max_queue: int,
+                 queue_timeout: float, retry_after: int):
+        env = f"ADMISSION_{name.upper()}"
+        self.name = name
+        self.prefixes = tuple(prefixes)
+        self.limit = int(os.getenv(f"{env}_CONCURRENCY", limit))
+        self.max_queue = int(os.getenv(f"{env}_QUEUE", max_queue))
+        self.queue_timeout = float(os.getenv(f"{env}_QUEUE_TIMEOUT", queue_timeout))
+        self.retry_after = int(os.getenv(f"{env}_RETRY_AFTER", retry_after))
+
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.stats = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_timeout": 0, "wait_seconds": 0.0}
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """슬롯을 얻으면 None, 버려야 하면 사유("queue_full" | "timeout")"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.stats["admitted"] += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            self.stats["shed_queue_full"] += 1
+            return "queue_full"
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self.stats["queued"] += 1
+        started = time.monotonic()
+        try:
+            # release() 가 슬롯을 넘겨주면 fut 가 완료됨 (active 는 그대로 유지)
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["shed_timeout"] += 1
+            return "timeout"
+        except asyncio.CancelledError:
+            # 클라이언트가 끊긴 경우: 이미 넘겨받은 슬롯이 있으면 반납
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+        finally:
+            if fut in self._waiters:
+                self._waiters.remove(fut)
+            self.stats["wait_seconds"] += time.monotonic() - started
+        self.stats["admitted"] += 1
+        return None
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+    def info(self) -> Dict[str, object]:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.active,
+            "queue_depth": self.queue_depth,
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in self.stats.items()},
+        }
+
+
+def default_route_groups(api_prefix: str = "/api/v1") -> List[RouteGroup]:
+    """
+    우선순위가 높은 순서. 먼저 일치하는 그룹이 적용됨.
+    sync 라우트는 모두 같은 스레드풀(기본 40)을 쓰므로 health/db/r2/generation 한도의 합이 그 이하가 되게 잡음.
+    """
+    p = api_prefix
+    return [
+        RouteGroup("health", ["/health", "/ready", "/metrics"], limit=4, max_queue=16, queue_timeout=1, retry_after=1),
+        # Gemini 호출은 수십 초씩 걸리므로 적은 슬롯 + 짧은 대기열
+        RouteGroup("generation", [f"{p}/gemini-frames"], limit=4, max_queue=8, queue_timeout=2, retry_after=10),
+        RouteGroup("r2", [f"{p}/images", f"{p}/frames/get-frame", f"{p}/frames/universities/from-r2",
+                          f"{p}/frames/sync"], limit=12, max_queue=64, queue_timeout=5, retry_after=2),
+        RouteGroup("db", [f"{p}/frames", f"{p}/add", f"{p}/list", f"{p}/delete"],
+                   limit=20, max_queue=256, queue_timeout=2, retry_after=1),
+    ]
+
+
+class AdmissionControlMiddleware:
+    """
+    경로 그룹별 동시성 제한 + 대기열(load shedding) ASGI 미들웨어.
+    한 그룹이 포화돼도(예: 생성 요청 폭주) 다른 그룹의 슬롯은 그대로 남아 있어서
+    가벼운 카탈로그 조회와 헬스체크는 계속 처리된다. 버려진 요청은 바로 503 + Retry-After.
+    """
+
+    def __init__(self, app, groups: Optional[List[RouteGroup]] = None, enabled: Optional[bool] = None):
+        self.app = app
+        self.groups = groups if groups is not None else default_route_groups()
+        if enabled is None:
+            enabled = os.getenv("ADMISSION_ENABLED", "true").lower() not in ("0", "false", "no")
+        self.enabled = enabled
+        admission_controls.append(self)
+
+    def _group_for(self, path: str) -> Optional[RouteGroup]:
+        for group in self.groups:
+            for prefix in group.prefixes:
+                if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                    return group
+        return None
+
+    async def _shed(self, send, group: RouteGroup, reason: str) -> None:
+        body = json.dumps({"detail": "Server is busy, retry later", "group": group.name, "reason": reason}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", str(group.retry_after).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        group = self._group_for(scope["path"])
+        if group is None:
+            return await self.app(scope, receive, send)
+
+        reason = await group.acquire()
+        if reason is not None:
+            return await self._shed(send, group, reason)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            group.release()
+
+    # ---------- metrics ----------
+    def info(self) -> Dict[str, Dict[str, object]]:
+        return {g.name: g.info() for g in self.groups}
+
+
+# 생성된 미들웨어 인스턴스 (/metrics 에서 읽음). 보통 하나.
+admission_controls: List[AdmissionControlMiddleware] = []
+
+
+def render_metrics() -> str:
+    """Prometheus text format. 값은 워커(프로세스) 단위."""
+    series: List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]] = [
+        ("admission_in_flight", "gauge", "Requests currently being processed", []),
+        ("admission_queue_depth", "gauge", "Requests waiting for a slot", []),
+        ("admission_limit", "gauge", "Concurrency limit", []),
+        ("admission_admitted_total", "counter", "Requests admitted", []),
+        ("admission_queued_total", "counter", "Requests that had to wait for a slot", []),
+        ("admission_shed_total", "counter", "Requests rejected with 503", []),
+        ("admission_queue_wait_seconds_total", "counter", "Time spent waiting in the queue", []),
+    ]
+    by_name = {s[0]: s[3] for s in series}
+    for control in admission_controls:
+        for g in control.groups:
+            labels = {"group": g.name}
+            by_name["admission_in_flight"].append((labels, g.active))
+            by_name["admission_queue_depth"].append((labels, g.queue_depth))
+            by_name["admission_limit"].append((labels, g.limit))
+            by_name["admission_admitted_total"].append((labels, g.stats["admitted"]))
+            by_name["admission_queued_total"].append((labels, g.stats["queued"]))
+            by_name["admission_shed_total"].append(({**labels, "reason": "queue_full"}, g.stats["shed_queue_full"]))
+            by_name["admission_shed_total"].append(({**labels, "reason": "timeout"}, g.stats["shed_timeout"]))
+            by_name["admission_queue_wait_seconds_total"].append((labels, round(g.stats["wait_seconds"], 6)))
+
+    lines = []
+    for name, kind, help_text, samples in series:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_str}}} {value}")
+    return "\n".join(lines) + "\n"
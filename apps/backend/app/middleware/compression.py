@@ -0,0 +1,185 @@
+import os
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import anyio
+
+try:
+    # brotli 는 선택 사항. 없으면 gzip 만 협상
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+# 같은 본문(카탈로그 캐시 hit 은 매번 같은 bytes 객체)을 다시 압축하지 않도록 최근 결과를 보관 (원본+압축 합계)
+COMPRESSION_MEMO_MAX_BYTES = int(float(os.getenv("COMPRESSION_MEMO_MAX_MB", "16")) * 1024 * 1024)
+
+# 이보다 큰 본문은 스레드에서 압축 (이벤트 루프를 수 ms 이상 막지 않도록)
+COMPRESSION_THREAD_MIN_BYTES = 256 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "image/svg+xml")
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """'gzip, br;q=0.9, *;q=0' -> {"gzip": 1.0, "br": 0.9, "*": 0.0}"""
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """클라이언트가 받는 인코딩 중 br > gzip 순으로 선택 (q=0 은 거부)"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for name in candidates:
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = COMPRESSION_GZIP_LEVEL,
+             brotli_quality: int = COMPRESSION_BROTLI_QUALITY) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class _CompressedMemo:
+    """(인코딩, 본문) -> 압축 결과 LRU. bytes 는 해시를 캐시하므로 같은 객체의 재조회는 싸다."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, encoding: str, body: bytes) -> Optional[bytes]:
+        if self.max_bytes <= 0:
+            return None
+        with self._lock:
+            data = self._entries.get((encoding, body))
+            if data is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end((encoding, body))
+            self.stats["hits"] += 1
+            return data
+
+    def put(self, encoding: str, body: bytes, data: bytes) -> None:
+        cost = len(body) + len(data)
+        if cost > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._entries.pop((encoding, body), None)
+            if old is not None:
+                self.size -= len(body) + len(old)
+            self._entries[(encoding, body)] = data
+            self.size += cost
+            while self.size > self.max_bytes:
+                (_, old_body), old_data = self._entries.popitem(last=False)
+                self.size -= len(old_body) + len(old_data)
+
+
+class CompressionMiddleware:
+    """
+    Accept-Encoding 에 따라 응답 본문을 br(brotli 설치 시) 또는 gzip 으로 압축하는 ASGI 미들웨어.
+    - 본문이 한 번에 오는 응답만 압축. 스트리밍 응답(NDJSON/SSE 배치 생성, 이미지 프록시 등)은
+      청크를 모아야 하므로 그대로 통과시킨다 (진행 상황이 바로 전달되도록)
+    - minimum_size 미만, 이미 Content-Encoding 이 있는 응답, JSON/텍스트가 아닌 응답은 건드리지 않음
+    - 본문 외 메시지(http.response.zerocopy, trailers 등)를 보내는 응답도 그대로 통과
+    Starlette 의 GZipMiddleware 와 달리 스트리밍을 버퍼링하지 않고, 같은 본문의 압축 결과를 재사용한다.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES,
+                 memo_max_bytes: int = COMPRESSION_MEMO_MAX_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.memo = _CompressedMemo(memo_max_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start: Optional[dict] = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                # zerocopy / pathsend / trailers 등 본문 외 메시지: 압축 대상이 아니므로 그대로 통과.
+                # 보류해 둔 start 를 먼저 보내야 순서가 맞는다
+                passthrough = True
+                if start is not None:
+                    await send(start)
+                return await send(message)
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._eligible(start, body):
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            data = self.memo.get(encoding, body)
+            if data is None:
+                if len(body) >= COMPRESSION_THREAD_MIN_BYTES:
+                    data = await anyio.to_thread.run_sync(compress, body, encoding)
+                else:
+                    data = compress(body, encoding)
+                self.memo.put(encoding, body, data)
+            headers = [(k, v) for k, v in start["headers"] if k not in (b"content-length", b"vary")]
+            vary = [v for k, v in start["headers"] if k == b"vary"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(data)).encode()),
+                (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+            ]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": data})
+            # 이후 메시지(trailers 등)는 그대로 통과
+            passthrough = True
+
+        await self.app(scope, receive, compressing_send)
+
+    def _eligible(self, start: dict, body: bytes) -> bool:
+        if len(body) < self.minimum_size or start["status"] in (204, 206, 304):
+            return False
+        content_type = b""
+        for name, value in start["headers"]:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,74 @@
+import json
+from typing import Iterable
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class UploadSizeLimitMiddleware:
+    """
+    업로드 경로의 요청 본문 크기를 제한하는 ASGI 미들웨어.
+    - Content-Length 가 한도를 넘으면 본문을 읽기 전에 바로 413
+    - Content-Length 가 없으면(chunked) 받은 바이트를 세다가 한도를 넘는 순간 413
+    FastAPI 가 multipart 를 파싱해서 임시 파일에 다 쓰기 전에 끊어낸다.
+    """
+
+    def __init__(self, app, max_bytes: int, path_prefixes: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def _reject(self, send) -> None:
+        body = json.dumps({"detail": f"Upload exceeds {self.max_bytes // (1024 * 1024)} MB limit"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT") \
+                or not scope["path"].startswith(self.path_prefixes):
+            return await self.app(scope, receive, send)
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    if int(value) > self.max_bytes:
+                        return await self._reject(send)
+                except ValueError:
+                    pass
+                break
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # 본문 파싱 실패로 앱이 만든 400 응답 대신 413 을 보냄
+            if exceeded:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
+        if exceeded and not response_started:
+            await self._reject(send)
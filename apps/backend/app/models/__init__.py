@@ -1 +1,2 @@
-# Frame Gen Models
\ No newline at end of file
+# Frame Gen Models
+from app.models.frame import Base, University, Frame, FrameThumbnail
@@ -1,15 +1,48 @@
-from sqlalchemy import Column, Integer, String, Text
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
 
+# 기존 univ.db 스키마와 같은 모양. 서버 DB 에서는 metadata.create_all 로 생성 (app/scripts/copy-db.py)
+
+
+class University(Base):
+    __tablename__ = "Universities"
+
+    university_id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(Text, nullable=False, unique=True)
+    r2_logo_url = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"<University(id={self.university_id}, name='{self.name}')>"
+
+
 class Frame(Base):
     __tablename__ = "frames"
+    __table_args__ = (
+        UniqueConstraint("university_id", "filename"),
+        Index("idx_frames_university_id", "university_id"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String(255), nullable=False)
-    description = Column(Text, nullable=True)
-    image_url = Column(String(255), nullable=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    university_id = Column(Integer, ForeignKey("Universities.university_id", ondelete="CASCADE"), nullable=False)
+    r2_url = Column(Text, nullable=False)
+    filename = Column(Text, nullable=False)
+    sort_order = Column(Integer, default=0)
 
     def __repr__(self):
-        return f"<Frame(id={self.id}, title='{self.title}')"
\ No newline at end of file
+        return f"<Frame(id={self.id}, university_id={self.university_id}, filename='{self.filename}')>"
+
+
+class FrameThumbnail(Base):
+    __tablename__ = "frame_thumbnails"
+    __table_args__ = (
+        Index("idx_frame_thumbnails_source_url", "source_url"),
+    )
+
+    source_key = Column(Text, primary_key=True)
+    width = Column(Integer, primary_key=True)
+    source_url = Column(Text, nullable=False)
+    source_etag = Column(String(128), nullable=False)
+    r2_key = Column(Text, nullable=False)
+    r2_url = Column(Text, nullable=False)
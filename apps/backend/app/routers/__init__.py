@@ -15,4 +15,8 @@ from app.routers.db_router import dbrouter as db_router
 from app.routers.univ_frames import router as univ_frames_router
 
 api_router.include_router(db_router)
-api_router.include_router(univ_frames_router)
\ No newline at end of file
+api_router.include_router(univ_frames_router)
+
+from app.routers.images import router as images_router
+
+api_router.include_router(images_router)
@@ -1,21 +1,16 @@
-import os
-import sqlite3
 from typing import List
-from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import Optional
 
+from app.services.catalog_cache import catalog_cache, dumps
+from app.services.database import database
+from app.services.repository import frames_repo
+
 # 라우터 정의
 router = APIRouter(prefix="/frames", tags=["frames"])
 
-# DB 경로 로드
-load_dotenv()
-DB_PATH = os.getenv("UNIV_DB_PATH")
-
-def get_conn():
-    return sqlite3.connect(DB_PATH)
-
 # -------------------------------
 # Pydantic 모델
 # -------------------------------
@@ -38,72 +33,52 @@ class Frame(FrameBase):
 # CRUD 엔드포인트
 # -------------------------------
 @router.get("/", response_model=List[Frame])
-def get_frames():
-    """모든 frame 불러오기"""
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, university_id, r2_url, filename, sort_order FROM frames")
-    rows = cur.fetchall()
-    conn.close()
-    return [
-        {"id": r[0], "university_id": r[1], "r2_url": r[2], "filename": r[3], "sort_order": r[4]}
-        for r in rows
-    ]
+async def get_frames():
+    """
+    모든 frame 불러오기.
+    DB 행을 바로 JSON bytes 로 직렬화해서 Response 로 반환 — response_model 은 문서(OpenAPI)용이고
+    Response 를 직접 반환하면 FastAPI 가 행마다 Pydantic 검증 + jsonable_encoder 를 하지 않음.
+    """
+    rows = await database.run(frames_repo.list_all())
+    return Response(content=dumps(rows), media_type="application/json")
+
+
+def _load_frame(frame_id: int) -> Optional[dict]:
+    return database.run_sync(frames_repo.get(frame_id))
 
 
 @router.get("/{frame_id:int}", response_model=Frame)
 def get_frame(frame_id: int):
-    """특정 frame 불러오기 (id 기준)"""
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, university_id, r2_url, filename, sort_order FROM frames WHERE id=?", (frame_id,))
-    row = cur.fetchone()
-    conn.close()
-    if not row:
+    """특정 frame 불러오기 (id 기준, 카탈로그 캐시 사용)"""
+    body = catalog_cache.frame(frame_id, _load_frame)
+    if body is None:
         raise HTTPException(status_code=404, detail="Frame not found")
-    return {"id": row[0], "university_id": row[1], "r2_url": row[2], "filename": row[3], "sort_order": row[4]}
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("/", response_model=Frame, status_code=status.HTTP_201_CREATED)
-def create_frame(frame: FrameCreate):
+async def create_frame(frame: FrameCreate):
     """새 frame 추가"""
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO frames (university_id, r2_url, filename, sort_order) VALUES (?, ?, ?, ?)",
-        (frame.university_id, frame.r2_url, frame.filename, frame.sort_order),
-    )
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
+    new_id = await database.run(frames_repo.create(frame.dict()))
+    catalog_cache.invalidate_university(frame.university_id)
     return {"id": new_id, **frame.dict()}
 
 
 @router.put("/{frame_id:int}", response_model=Frame)
-def update_frame(frame_id: int, frame: FrameBase):
+async def update_frame(frame_id: int, frame: FrameBase):
     """frame 업데이트"""
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE frames SET university_id=?, r2_url=?, filename=?, sort_order=? WHERE id=?",
-        (frame.university_id, frame.r2_url, frame.filename, frame.sort_order, frame_id),
-    )
-    if cur.rowcount == 0:
-        conn.close()
+    updated, old_university_id = await database.run(frames_repo.update(frame_id, frame.dict()))
+    if not updated:
         raise HTTPException(status_code=404, detail="Frame not found")
-    conn.commit()
-    conn.close()
+    # 대학이 바뀐 경우 이전/새 대학 목록 모두 무효화
+    catalog_cache.invalidate_frame(frame_id, old_university_id, frame.university_id)
     return {"id": frame_id, **frame.dict()}
 
 
 @router.delete("/{frame_id:int}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_frame(frame_id: int):
+async def delete_frame(frame_id: int):
     """frame 삭제"""
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM frames WHERE id=?", (frame_id,))
-    if cur.rowcount == 0:
-        conn.close()
+    deleted, university_id = await database.run(frames_repo.delete(frame_id))
+    if not deleted:
         raise HTTPException(status_code=404, detail="Frame not found")
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    catalog_cache.invalidate_frame(frame_id, university_id)
@@ -1,45 +1,214 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
 import os
+import threading
+import time
 
 from app.dependencies import get_gemini_frame_service
-from app.services.gemini_frame_service import GeminiAPIError
+from app.services.gemini_frame_service import GeminiAPIError, GeneratedImage, GenerationCancelled
+from app.services import output_store
+from app.services.photo_dedupe import DedupeHit, PhotoSignature, photo_dedupe
+from app.services.lifecycle import lifecycle, ShuttingDown
+from app.services.uploads import IngestedUpload, receive_upload
 
 router = APIRouter(prefix="/gemini-frames", tags=["gemini-frames"])
 
-@router.post("/", response_model=dict)
+
+def _multipart_body(**fields: dict) -> dict:
+    """OpenAPI request body for endpoints that parse their multipart form themselves (see receive_upload)"""
+    properties = {**fields, "image": {"type": "string", "format": "binary"}}
+    schema = {"type": "object", "required": list(properties), "properties": properties}
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": schema}}}}
+
+
+def _required_fields(fields: Dict[str, str], *names: str) -> List[str]:
+    missing = [name for name in names if name not in fields]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Field required: {', '.join(missing)}")
+    return [fields[name] for name in names]
+
+
+# The multipart body is parsed by receive_upload rather than Form()/File() params, so the photo is hashed and
+# size-checked while it is received instead of after Starlette has spooled all of it
+@router.post("/", response_model=dict, openapi_extra=_multipart_body(
+    university_name={"type": "string"},
+    university_mascot={"type": "string"},
+))
 async def create_gemini_frame(
-    university_name: str = Form(...),
-    university_mascot: str = Form(...),
-    image: UploadFile = File(...),
+    request: Request,
+    inline: bool = Query(False, description="also return the image as a base64 data URI (image_base64)"),
+    fresh: bool = Query(False, description="always call Gemini, even if a near-identical photo was generated recently"),
     frame_service = Depends(get_gemini_frame_service)
 ):
     """Create a profile picture frame with university colors and mascot using Gemini API"""
+    fields, upload = await receive_upload(request)
     try:
-        # Read the image data
-        image_data = await image.read()
-        
-        # Save the uploaded image
-        image_path = frame_service.save_uploaded_image(image_data)
-        
-        # Create the frame using Gemini
-        result_path = frame_service.create_frame_with_gemini(
-            image_path, 
-            university_name, 
-            university_mascot
-        )
-        
-        if not result_path:
-            # Non-exceptional failure from service; treat as bad gateway to indicate upstream issue
-            raise HTTPException(status_code=502, detail="Failed to create frame with Gemini")
+        university_name, university_mascot = _required_fields(fields, "university_name", "university_mascot")
+        with lifecycle.track_generation():
+            return await _create_gemini_frame(university_name, university_mascot, upload, frame_service, inline, fresh,
+                                              _dedupe_scope(request))
+    except ShuttingDown:
+        # Worker is draining for shutdown; let the load balancer retry elsewhere
+        raise HTTPException(status_code=503, detail="Server is shutting down, please retry", headers={"Retry-After": "1"})
+    finally:
+        upload.close()
+
+
+async def _deliver(frame_service, generated: GeneratedImage, inline: bool) -> dict:
+    """
+    Upload the generated image to the bucket under its content hash and build the response fields.
+    The upload runs in the threadpool while the optional local copy / data URI are prepared.
+    Without R2 (local development), or when the upload fails, the image is kept in outputs/ and
+    returned inline.
+    """
+    use_bucket = output_store.bucket_available()
+    upload = asyncio.ensure_future(run_in_threadpool(output_store.store_generated, generated)) if use_bucket else None
+    fields = {"sha256": generated.sha256, "mime_type": generated.mime_type, "bytes": generated.size,
+              "image_url": None, "image_key": None, "result_path": None}
+    upload_error = None
+    try:
+        if not use_bucket or output_store.GEMINI_KEEP_LOCAL_OUTPUT:
+            fields["result_path"] = await run_in_threadpool(generated.save_to, frame_service.output_dir or "outputs")
+        if inline or not use_bucket:
+            fields["image_base64"] = await run_in_threadpool(generated.data_uri)
+    finally:
+        if upload is not None:
+            try:
+                fields.update(await upload)
+            except Exception as e:
+                upload_error = e
+    if upload_error is not None:
+        # The Gemini call is already paid for, so don't turn a bucket error into a 500 that loses the image
+        print(f"[gemini_frames] bucket upload failed for {generated.sha256}, returning it inline: {upload_error}")
+        if fields["result_path"] is None:
+            fields["result_path"] = await run_in_threadpool(generated.save_to, frame_service.output_dir or "outputs")
+        if "image_base64" not in fields:
+            fields["image_base64"] = await run_in_threadpool(generated.data_uri)
+    return fields
+
+
+async def _reuse(hit: DedupeHit, inline: bool) -> Optional[dict]:
+    """
+    Response fields for a previous result of a near-identical (photo, university, mascot) request.
+    Returns None (and forgets the entry) when that result can no longer be served.
+    """
+    fields = dict(hit.fields)
+    if fields.get("image_key"):
+        if not output_store.bucket_available():
+            photo_dedupe.discard(hit)
+            return None
+        # Presigned URLs expire, so sign again instead of replaying the stored one
+        fields["image_url"] = output_store.url_for_generated(fields["image_key"])
+    if inline or not fields.get("image_key"):
+        generated = await run_in_threadpool(output_store.load_generated, fields)
+        if generated is None:
+            photo_dedupe.discard(hit)
+            return None
+        fields["image_base64"] = await run_in_threadpool(generated.data_uri)
+    fields["dedupe"] = {"distance": hit.distance, "exact": hit.exact}
+    return fields
+
+
+def _remember(dedupe_key, sig: Optional[PhotoSignature], upload_sha256: str, delivered: dict) -> None:
+    if sig is not None:
+        photo_dedupe.add(dedupe_key, sig, upload_sha256,
+                         {k: v for k, v in delivered.items() if k != "image_base64"})
+
+
+def _dedupe_scope(request: Request) -> Optional[str]:
+    """
+    Who a result may be reused for: the client's X-Session-Id, or else its address.
+    Results are never handed to another client, even for a near-identical photo.
+    """
+    session = request.headers.get("x-session-id")
+    if session:
+        return f"session:{session[:128]}"
+    return f"addr:{request.client.host}" if request.client else None
+
+
+async def _find_or_claim(dedupe_key, sig: PhotoSignature, upload_sha256: str,
+                         inline: bool) -> Tuple[Optional[dict], Optional[Future]]:
+    """
+    Reused fields for a near-identical earlier upload, or a claim on generating it (release with
+    photo_dedupe.finish). If the same photo is being generated right now, wait for that generation
+    instead of calling Gemini a second time. Returns (None, None) when that generation failed.
+    """
+    hit = photo_dedupe.lookup(dedupe_key, sig, upload_sha256)
+    reused = await _reuse(hit, inline) if hit is not None else None
+    if reused is not None:
+        return reused, None
+    claim, owner = photo_dedupe.begin(dedupe_key, sig)
+    if owner:
+        return None, claim
+    # Shielded: a waiter's client going away must not cancel the claim shared with the others
+    await asyncio.shield(asyncio.wrap_future(claim))
+    hit = photo_dedupe.lookup(dedupe_key, sig, upload_sha256)
+    return (await _reuse(hit, inline) if hit is not None else None), None
+
+
+async def _create_gemini_frame(university_name: str, university_mascot: str, upload: IngestedUpload, frame_service,
+                               inline: bool = False, fresh: bool = False, scope: Optional[str] = None):
+    try:
+        # The photo was size-checked and hashed while it was received; the save, decode and base64 steps
+        # each re-read the same spooled buffer
+
+        # One Pillow decode gives the mime type and the photo signature used to find near-duplicate uploads
+        # (None for low-detail photos, which are never deduplicated)
+        mime_type, sig = await run_in_threadpool(frame_service.inspect_image_file, upload.file)
+        if scope is None:
+            sig = None
+        dedupe_key = photo_dedupe.key_for(university_name, university_mascot, scope) if sig is not None else None
         
-        # Convert the result to base64 and report accurate mime
-        image_base64 = frame_service.image_to_base64(result_path)
+        # Save the uploaded image (named by content hash, so a repeat upload is not written again)
+        image_path = await run_in_threadpool(frame_service.save_uploaded_file, upload.file, upload.sha256)
+
+        # Same photo (re-encoded / cropped by a pixel) from the same client for the same university and mascot:
+        # reuse that result, or wait for it if it is being generated right now
+        reused = claim = None
+        if sig is not None and not fresh:
+            reused, claim = await _find_or_claim(dedupe_key, sig, upload.sha256, inline)
+        if reused is not None:
+            return {
+                "status": "success",
+                "message": "Reused a frame generated recently for the same photo",
+                "data": {
+                    "university_name": university_name,
+                    "university_mascot": university_mascot,
+                    "image_path": image_path,
+                    "reused": True,
+                    **reused,
+                }
+            }
+
         try:
-            mime = frame_service._detect_mime_type(result_path)
-        except Exception:
-            mime = "image/jpeg"
+            # Base64-encode from the buffer (no read-back from disk)
+            encoded = await run_in_threadpool(frame_service.encode_image_file, upload.file, mime_type)
+
+            # Create the frame using Gemini (blocking HTTP call, keep it off the event loop)
+            generated = await run_in_threadpool(
+                frame_service.generate_frame,
+                image_path, 
+                university_name, 
+                university_mascot,
+                encoded
+            )
+
+            if not generated:
+                # Non-exceptional failure from service; treat as bad gateway to indicate upstream issue
+                raise HTTPException(status_code=502, detail="Failed to create frame with Gemini")
+
+            # Upload to the bucket and return its URL (data URI only on request or without R2)
+            delivered = await _deliver(frame_service, generated, inline)
+            _remember(dedupe_key, sig, upload.sha256, delivered)
+        finally:
+            # Wake requests waiting on this generation (they reuse the result, or generate on their own if it failed)
+            if claim is not None:
+                photo_dedupe.finish(dedupe_key, claim)
         
         return {
             "status": "success",
@@ -48,8 +217,8 @@ async def create_gemini_frame(
                 "university_name": university_name,
                 "university_mascot": university_mascot,
                 "image_path": image_path,
-                "result_path": result_path,
-                "image_base64": f"data:{mime};base64,{image_base64}"
+                "reused": False,
+                **delivered,
             }
         }
     
@@ -57,17 +226,167 @@ async def create_gemini_frame(
         # Let HTTPExceptions bubble up unchanged
         raise
     except GeminiAPIError as e:
-        # Map specific Gemini errors to appropriate HTTP status codes
-        if e.code == 429 or (e.status and "RESOURCE_EXHAUSTED" in e.status):
-            raise HTTPException(
-                status_code=429,
-                detail=(e.message or "Google Gemini API quota exceeded. Please try again later.")
-            )
-        # 4xx from upstream -> 502 Bad Gateway with detail
-        status = 502
-        if 400 <= (e.code or 0) < 500:
-            status = 502
-        raise HTTPException(status_code=status, detail=f"Gemini API error: {e.status or e.code}: {e.message}")
+        raise _gemini_http_error(e)
     except Exception as e:
         # Generic unexpected error
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/dedupe/stats")
+def dedupe_stats() -> dict:
+    """Near-duplicate upload index: hit/miss counts, dedupe rate and lookup latency (per worker)"""
+    return photo_dedupe.info()
+
+
+def _gemini_http_error(e: GeminiAPIError) -> HTTPException:
+    # Map specific Gemini errors to appropriate HTTP status codes
+    if e.code == 429 or (e.status and "RESOURCE_EXHAUSTED" in e.status):
+        return HTTPException(
+            status_code=429,
+            detail=(e.message or "Google Gemini API quota exceeded. Please try again later.")
+        )
+    # 4xx from upstream -> 502 Bad Gateway with detail
+    status = 502
+    if 400 <= (e.code or 0) < 500:
+        status = 502
+    return HTTPException(status_code=status, detail=f"Gemini API error: {e.status or e.code}: {e.message}")
+
+
+# -------------------------------
+# Batch generation: one photo, many (university, mascot) targets, results streamed as they finish
+# -------------------------------
+GEMINI_BATCH_CONCURRENCY = int(os.getenv("GEMINI_BATCH_CONCURRENCY", "4"))
+GEMINI_BATCH_MAX_TARGETS = int(os.getenv("GEMINI_BATCH_MAX_TARGETS", "20"))
+
+
+def _parse_targets(raw: str) -> List[Tuple[str, str]]:
+    """Accepts [{"university_name": ..., "university_mascot": ...}, ...] or [[name, mascot], ...]"""
+    try:
+        items = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="targets must be a JSON list")
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=422, detail="targets must be a non-empty JSON list")
+    if len(items) > GEMINI_BATCH_MAX_TARGETS:
+        raise HTTPException(status_code=422, detail=f"At most {GEMINI_BATCH_MAX_TARGETS} targets per batch")
+    targets = []
+    for item in items:
+        if isinstance(item, dict):
+            name, mascot = item.get("university_name"), item.get("university_mascot")
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            name, mascot = item
+        else:
+            name = mascot = None
+        if not isinstance(name, str) or not isinstance(mascot, str) or not name or not mascot:
+            raise HTTPException(status_code=422, detail=f"Invalid target: {item!r}")
+        targets.append((name, mascot))
+    return targets
+
+
+def _format_event(event: str, data: dict, fmt: str) -> bytes:
+    body = json.dumps(data)
+    if fmt == "sse":
+        return f"event: {event}\ndata: {body}\n\n".encode("utf-8")
+    return (json.dumps({"event": event, **data}) + "\n").encode("utf-8")
+
+
+@router.post("/batch", openapi_extra=_multipart_body(
+    targets={"type": "string",
+             "description": 'JSON list, e.g. [{"university_name": "Harvard", "university_mascot": "Crimson"}]'},
+))
+async def create_gemini_frames_batch(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$", description="ndjson (chunked) or sse (Server-Sent Events)"),
+    inline: bool = Query(False, description="also return each image as a base64 data URI (image_base64)"),
+    fresh: bool = Query(False, description="always call Gemini, even if a near-identical photo was generated recently"),
+    frame_service = Depends(get_gemini_frame_service),
+):
+    """Generate frames for several universities/mascots from one photo; each result is streamed as soon as it is ready"""
+    fields, upload = await receive_upload(request)
+    try:
+        parsed = _parse_targets(*_required_fields(fields, "targets"))
+        if lifecycle.draining:
+            raise HTTPException(status_code=503, detail="Server is shutting down, please retry",
+                                headers={"Retry-After": "1"})
+        image_path = await run_in_threadpool(frame_service.save_uploaded_file, upload.file, upload.sha256)
+        # Decode (mime type + photo signature) and base64-encode the photo once for all targets
+        mime_type, sig = await run_in_threadpool(frame_service.inspect_image_file, upload.file)
+        encoded = await run_in_threadpool(frame_service.encode_image_file, upload.file, mime_type)
+    finally:
+        # Nothing below reads the spooled photo again
+        upload.close()
+    scope = _dedupe_scope(request)
+    if scope is None:
+        sig = None
+    started = time.perf_counter()
+    # Set when the client goes away; generation threads check it (see GeminiFrameService.generate_frame)
+    cancel = threading.Event()
+
+    async def generate_one(index: int, name: str, mascot: str, sem: asyncio.Semaphore) -> dict:
+        result = {"index": index, "university_name": name, "university_mascot": mascot}
+        dedupe_key = photo_dedupe.key_for(name, mascot, scope) if sig is not None else None
+        claim = None
+        if sig is not None and not fresh:
+            reused, claim = await _find_or_claim(dedupe_key, sig, upload.sha256, inline)
+            if reused is not None:
+                result.update(status="success", reused=True, **reused)
+                result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                return result
+        try:
+            async with sem:
+                try:
+                    generated = await run_in_threadpool(
+                        frame_service.generate_frame, image_path, name, mascot, encoded, cancel=cancel
+                    )
+                    if not generated:
+                        raise HTTPException(status_code=502, detail="Failed to create frame with Gemini")
+                    delivered = await _deliver(frame_service, generated, inline)
+                    _remember(dedupe_key, sig, upload.sha256, delivered)
+                    result.update(status="success", reused=False, **delivered)
+                except GeminiAPIError as e:
+                    err = _gemini_http_error(e)
+                    result.update(status="error", status_code=err.status_code, detail=err.detail)
+                except GenerationCancelled as e:
+                    result.update(status="error", status_code=499, detail=str(e))
+                except HTTPException as e:
+                    result.update(status="error", status_code=e.status_code, detail=e.detail)
+                except Exception as e:
+                    result.update(status="error", status_code=500, detail=str(e))
+        finally:
+            # Also on cancel while waiting for a slot, so requests waiting on this target don't hang
+            if claim is not None:
+                photo_dedupe.finish(dedupe_key, claim)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def stream():
+        try:
+            with lifecycle.track_generation():
+                sem = asyncio.Semaphore(GEMINI_BATCH_CONCURRENCY)
+                tasks = [asyncio.create_task(generate_one(i, n, m, sem)) for i, (n, m) in enumerate(parsed)]
+                succeeded = 0
+                try:
+                    for next_done in asyncio.as_completed(tasks):
+                        result = await next_done
+                        succeeded += result["status"] == "success"
+                        yield _format_event("result", result, format)
+                finally:
+                    # Client went away (or we are done): targets still waiting for a slot never start.
+                    # Calls already running in the threadpool can't be interrupted; the event makes them
+                    # skip a request not yet sent, or stop reading a streaming response. A call Gemini
+                    # has already received is still billed.
+                    cancel.set()
+                    for t in tasks:
+                        t.cancel()
+                yield _format_event("done", {
+                    "total": len(parsed),
+                    "succeeded": succeeded,
+                    "failed": len(parsed) - succeeded,
+                    "image_path": image_path,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                }, format)
+        except ShuttingDown:
+            yield _format_event("error", {"status_code": 503, "detail": "Server is shutting down, please retry"}, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,124 @@
+import re
+from typing import BinaryIO, Optional, Tuple
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+
+from app.dependencies import get_r2_client
+from app.services.image_cache import image_cache
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """단일 'bytes=start-end' 범위만 지원. 잘못된 범위면 416용으로 (-1, -1) 반환."""
+    if not header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None  # 다중 범위 등은 무시하고 전체 응답
+    if not m.group(1):
+        # suffix range: 마지막 N 바이트
+        length = int(m.group(2))
+        if length == 0:
+            return (-1, -1)
+        return (max(0, size - length), size - 1)
+    start = int(m.group(1))
+    end = int(m.group(2)) if m.group(2) else size - 1
+    if start >= size or end < start:
+        return (-1, -1)
+    return (start, min(end, size - 1))
+
+
+class CachedFileResponse(Response):
+    """
+    이미 열어 둔 디스크 캐시 파일의 [start, end] 구간을 전송 (전송 후 파일을 닫음).
+    경로가 아니라 fd 에서 읽으므로, 그 사이 LRU 삭제나 재검증으로 파일이 교체돼도
+    열어 둔 시점의 내용과 Content-Length 가 그대로 유지된다.
+    서버가 ASGI 'http.response.zerocopy' 확장을 지원하면 sendfile 로 넘기고,
+    아니면 고정 크기 청크로 읽어서 보냄.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, file: BinaryIO, start: int, end: int, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.file = file
+        self.start = start
+        self.count = end - start + 1
+        self.headers["content-length"] = str(self.count)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if scope["method"] == "HEAD" or self.count <= 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": self.file,
+                    "offset": self.start,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+            f = anyio.wrap_file(self.file)
+            await f.seek(self.start)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            self.file.close()
+
+
+@router.get("/cache/stats")
+def image_cache_stats():
+    """디스크 캐시 상태 (hit/miss/evictions, 사용 바이트 수)"""
+    return image_cache.info()
+
+
+@router.get("/{key:path}", dependencies=[Depends(get_r2_client)])
+@router.head("/{key:path}", dependencies=[Depends(get_r2_client)], operation_id="head_image")
+async def get_image(key: str, request: Request):
+    """R2 객체를 로컬 디스크 캐시를 거쳐 프록시. Range / If-None-Match 지원."""
+    if not key or key.startswith("/") or ".." in key.split("/"):
+        raise HTTPException(status_code=400, detail="Invalid key")
+    # 파일을 먼저 열어 둠: 이후 evict/교체돼도 이 fd 의 내용과 크기로 끝까지 응답
+    try:
+        entry, file, size = await image_cache.open(key)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Image not found: '{key}'")
+    except FileNotFoundError:
+        # 다시 받아온 직후에도 evict 된 경우 (캐시가 너무 작음)
+        raise HTTPException(status_code=503, detail="Cache entry evicted, retry")
+
+    etag = f'"{entry["etag"]}"'
+    headers = {
+        "etag": etag,
+        "accept-ranges": "bytes",
+        "cache-control": "public, max-age=3600",
+    }
+    if request.headers.get("if-none-match") == etag:
+        file.close()
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == etag:
+        byte_range = _parse_range(request.headers.get("range"), size)
+    if byte_range == (-1, -1):
+        file.close()
+        return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+    if byte_range is not None:
+        start, end = byte_range
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+        return CachedFileResponse(file, start, end, 206, headers, entry["content_type"])
+    return CachedFileResponse(file, 0, size - 1, 200, headers, entry["content_type"])
@@ -1,15 +1,23 @@
 # app/routers/univ_frames.py
-from fastapi import APIRouter, HTTPException, Query
-from typing import Dict, Any, List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from typing import Dict, Any, List, Optional
 from app.services.univ_frames_service import (
     find_university_id_by_name,
-    get_frames_for_university_id,
-    on_demand_sync_by_folder,
+    get_frames_body_for_university_id,
+    universities_with_frames_body,
+    sync_university_frames,
+    sync_bucket,
     list_all_universities,
     list_universities_with_frames,
     list_universities_with_frames_from_r2,
-    get_public_frame_urls_for_university
+    get_public_frame_urls_for_university,
+    get_srcsets_for_urls,
 )
+from app.dependencies import get_r2_client
+from app.services.r2_client import r2_available
+from app.services.catalog_manifest import publish_catalog
+from app.services.catalog_cache import catalog_cache, dumps
 from urllib.parse import quote
 
 
@@ -19,10 +27,26 @@ router = APIRouter(prefix="/frames", tags=["frames"])
 # def list_universities():
 #     return list_all_universities()
 
+def _json(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+def _frames_envelope(uid: int, name: Optional[str], count: int, frames_body: bytes) -> Response:
+    """캐시된 frames JSON 을 다시 인코딩하지 않고 응답 본문에 끼워넣음"""
+    head: Dict[str, Any] = {"university_id": uid}
+    if name is not None:
+        head["university_name"] = name
+    head.update(has_frames=True, count=count)
+    return _json(dumps(head)[:-1] + b',"frames":' + frames_body + b"}")
+
 @router.get("/universities", response_model=List[Dict[str, Any]])
 def list_universities():
     """프레임이 있는 대학 리스트만 반환"""
-    return list_universities_with_frames()
+    return _json(universities_with_frames_body())
+
+@router.get("/cache/stats")
+def catalog_cache_stats() -> Dict[str, Any]:
+    """카탈로그 캐시 hit ratio / 항목 수 / 메모리 사용량"""
+    return catalog_cache.info()
 
 @router.get("/by-name")
 def frames_by_university_name(
@@ -35,13 +59,14 @@ def frames_by_university_name(
     if uid is None:
         raise HTTPException(status_code=404, detail=f"University not found for '{name}'")
 
-    frames = get_frames_for_university_id(uid)
-    print("DEBUG >>> Frames before sync:", frames)
-    if not frames and sync_if_empty:
-        on_demand_sync_by_folder(name, uid)
-        frames = get_frames_for_university_id(uid)
+    count, frames_body = get_frames_body_for_university_id(uid)
+    print("DEBUG >>> Frames before sync:", count)
+    # R2 가 설정되지 않은 환경(로컬 개발 등)에서는 동기화 없이 DB 결과만 반환
+    if not count and sync_if_empty and r2_available():
+        sync_university_frames(name, uid)
+        count, frames_body = get_frames_body_for_university_id(uid)
 
-    if not frames:
+    if not count:
         return {
             "university_id": uid,
             "university_name": name,
@@ -49,14 +74,8 @@ def frames_by_university_name(
             "frames": [],
             "message": f"No frames found for '{name}'.",
         }
-    print("DEBUG >>> Frames after sync:", frames)
-    return {
-        "university_id": uid,
-        "university_name": name,
-        "has_frames": True,
-        "count": len(frames),
-        "frames": frames,
-    }
+    print("DEBUG >>> Frames after sync:", count)
+    return _frames_envelope(uid, name, count, frames_body)
     
 @router.get("/by-id")
 def frames_by_university_id(
@@ -64,23 +83,28 @@ def frames_by_university_id(
 ) -> Dict[str, Any]:
     print("DEBUG >>> UID:", uid)
 
-    frames = get_frames_for_university_id(uid)
-    if not frames:
+    count, frames_body = get_frames_body_for_university_id(uid)
+    if not count:
         return {
             "university_id": uid,
             "has_frames": False,
             "frames": [],
             "message": f"No frames found for '{uid}'.",
         }
-    print("DEBUG >>> Frames after sync:", frames)
-    return {
-        "university_id": uid,
-        "has_frames": True,
-        "count": len(frames),
-        "frames": frames,
-    }
+    print("DEBUG >>> Frames after sync:", count)
+    return _frames_envelope(uid, None, count, frames_body)
     
-@router.get("/universities/from-r2", response_model=List[str])
+@router.post("/sync", dependencies=[Depends(get_r2_client)])
+def sync_frames_from_r2(
+    publish: bool = Query(False, description="동기화 후 카탈로그 매니페스트도 R2 에 게시 (내용이 바뀐 경우에만 업로드)")
+) -> Dict[str, Any]:
+    """R2 버킷 전체를 DB frames 테이블과 동기화 (on-demand sync 의 negative cache 도 초기화)"""
+    result = sync_bucket()
+    if publish:
+        result["catalog"] = publish_catalog()
+    return result
+
+@router.get("/universities/from-r2", response_model=List[str], dependencies=[Depends(get_r2_client)])
 def list_universities_from_r2(
     strict_check: bool = Query(False, description="폴더 내부에 실제 이미지가 있는지 빠르게 확인")
 ) -> List[str]:
@@ -90,7 +114,7 @@ def list_universities_from_r2(
     return list_universities_with_frames_from_r2(strict_check=strict_check)
 
 
-@router.get("/get-frame", response_model=List[str])
+@router.get("/get-frame", response_model=List[str], dependencies=[Depends(get_r2_client)])
 def get_frame(
     name: str = Query(..., description="대학 이름(폴더명)"),
     recursive: bool = Query(True, description="하위 폴더까지 */1.png 탐색"),
@@ -98,4 +122,17 @@ def get_frame(
     urls = get_public_frame_urls_for_university(name=name, recursive=recursive)
     if not urls:
         raise HTTPException(status_code=404, detail=f"No '1.png' found under '{name}/'")
-    return urls
\ No newline at end of file
+    return urls
+
+
+@router.get("/get-frame/srcset", response_model=List[Dict[str, Any]], dependencies=[Depends(get_r2_client)])
+def get_frame_with_srcset(
+    name: str = Query(..., description="대학 이름(폴더명)"),
+    recursive: bool = Query(True, description="하위 폴더까지 */1.png 탐색"),
+) -> List[Dict[str, Any]]:
+    """get-frame 과 동일하되, 각 URL 에 썸네일 srcset 맵을 함께 반환"""
+    urls = get_public_frame_urls_for_university(name=name, recursive=recursive)
+    if not urls:
+        raise HTTPException(status_code=404, detail=f"No '1.png' found under '{name}/'")
+    srcsets = get_srcsets_for_urls(urls)
+    return [{"url": u, "srcset": srcsets.get(u, {})} for u in urls]
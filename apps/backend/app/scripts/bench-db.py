@@ -0,0 +1,112 @@
+"""
+repository 계층의 읽기/쓰기 처리량과 지연시간을 DB 백엔드별로 측정한다.
+같은 워크로드를 여러 DATABASE_URL 에 대해 돌려 비교할 수 있음.
+
+    cd apps/backend
+    python app/scripts/bench-db.py [--url sqlite:///univ.db] [--url postgresql://...] [--requests 2000] [--concurrency 32]
+
+워크로드 (요청당 하나, 카탈로그 캐시를 거치지 않음):
+- universities_with_frames : 프레임이 있는 대학 목록
+- frames_for_university    : 대학 하나의 프레임 + srcset
+- find_university          : 이름으로 id 조회 (대소문자 무시)
+- upsert_frame             : --write-ratio 비율만큼, 벤치 전용 파일명으로 upsert 후 마지막에 삭제
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import delete
+from sqlalchemy.engine import make_url
+
+from app.config import database_url, settings
+from app.services.database import Database
+from app.services.repository import FrameRepository, ThumbnailRepository, UniversityRepository, frames_t
+
+BENCH_FILENAME = "__bench__.png"
+
+
+async def bench(url: str, requests: int, concurrency: int, write_ratio: float, seed: int) -> dict:
+    db = Database(url)
+    universities, frames, thumbs = UniversityRepository(db), FrameRepository(db), ThumbnailRepository(db)
+    await thumbs.ensure_table()
+    with_frames = await universities.list_with_frames()
+    pairs = await universities.id_name_pairs()
+    if not with_frames:
+        raise SystemExit(f"{url}: no universities with frames to benchmark")
+
+    rng = random.Random(seed)
+    ops = []
+    for _ in range(requests):
+        if rng.random() < write_ratio:
+            u = rng.choice(with_frames)
+            ops.append(("upsert_frame", frames.upsert(u["id"], BENCH_FILENAME, "bench", rng.randint(0, 9))))
+            continue
+        kind = rng.choice(("universities_with_frames", "frames_for_university", "find_university"))
+        if kind == "universities_with_frames":
+            ops.append((kind, universities.list_with_frames()))
+        elif kind == "frames_for_university":
+            ops.append((kind, frames.for_university(rng.choice(with_frames)["id"])))
+        else:
+            ops.append((kind, universities.find_id_exact(rng.choice(pairs)[1].upper())))
+
+    latencies = {}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def run(kind, coro):
+        async with sem:
+            t0 = time.perf_counter()
+            await coro
+            latencies.setdefault(kind, []).append((time.perf_counter() - t0) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(k, c) for k, c in ops))
+    elapsed = time.perf_counter() - started
+
+    if write_ratio:
+        async with db.engine.begin() as con:
+            await con.execute(delete(frames_t).where(frames_t.c.filename == BENCH_FILENAME))
+    pool = db.pool_status()
+    await db.dispose()
+
+    def pct(values, p):
+        return round(statistics.quantiles(values, n=100)[p - 1], 2) if len(values) > 1 else round(values[0], 2)
+
+    return {
+        "url": make_url(url).render_as_string(hide_password=True),
+        "requests": requests,
+        "concurrency": concurrency,
+        "ops_per_sec": round(requests / elapsed, 1),
+        "pool": pool,
+        "latency_ms": {k: {"n": len(v), "p50": pct(v, 50), "p95": pct(v, 95), "p99": pct(v, 99)}
+                       for k, v in sorted(latencies.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DB repository layer per backend")
+    parser.add_argument("--url", action="append", help="database URL (repeatable, default: DATABASE_URL)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-ratio", type=float, default=0.0, help="fraction of requests that upsert a frame")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    urls = [database_url(u) for u in args.url] if args.url else [settings.DATABASE_URL]
+    for url in urls:
+        result = asyncio.run(bench(url, args.requests, args.concurrency, args.write_ratio, args.seed))
+        print(f"\n== {result.pop('url')}")
+        for k, v in result.items():
+            print(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+카탈로그 응답 직렬화 비용을 10k 행 기준으로 측정한다 (DB 없이 합성 데이터 사용).
+
+    cd apps/backend
+    python app/scripts/bench-serialization.py [--rows 10000] [--repeat 20]
+
+비교하는 경로:
+- fastapi_default : dict 반환 -> response_model(List[Frame]) 검증/직렬화 -> JSONResponse(stdlib json)  (이전 GET /frames/)
+- stdlib_json     : 검증 없이 stdlib json 으로 bytes                                                    (orjson 없을 때의 dumps)
+- fast_path       : catalog_cache.dumps (orjson) 로 바로 bytes                                            (현재 GET /frames/)
+- gzip / br       : fast_path 본문을 CompressionMiddleware 설정으로 압축
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.middleware import compression
+from app.routers.frames import Frame
+from app.services.catalog_cache import dumps, orjson
+
+
+def make_rows(n: int) -> List[dict]:
+    return [
+        {
+            "id": i,
+            "university_id": 1 + i // 8,
+            "r2_url": f"https://pub-0123456789abcdef.r2.dev/University%20{i // 8}/frame-{i % 8}/1.png",
+            "filename": f"University {i // 8}/frame-{i % 8}/1.png",
+            "sort_order": i % 8,
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn, repeat: int) -> tuple:
+    result = fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return result, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark catalog response serialization")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    field = create_response_field(name="Response_get_frames", type_=List[Frame])
+    loop = asyncio.new_event_loop()
+
+    def fastapi_default() -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=rows, is_coroutine=True))
+        return JSONResponse(content).body
+
+    def stdlib_json() -> bytes:
+        return json.dumps(rows, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    def fast_path() -> bytes:
+        return dumps(rows)
+
+    results = {}
+    for name, fn in (("fastapi_default", fastapi_default), ("stdlib_json", stdlib_json), ("fast_path", fast_path)):
+        body, ms = timed(fn, args.repeat)
+        results[name] = (body, ms)
+
+    bodies = {name: json.loads(body) for name, (body, _) in results.items()}
+    assert all(b == rows for b in bodies.values()), "serialized bodies differ"
+
+    body = results["fast_path"][0]
+    encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+    for enc in encodings:
+        data, ms = timed(lambda: compression.compress(body, enc), max(3, args.repeat // 4))
+        results[enc] = (data, ms)
+
+    scale = 10000 / args.rows
+    baseline = results["fastapi_default"][1]
+    print(f"rows: {args.rows}  (orjson: {'yes' if orjson is not None else 'no'}, "
+          f"brotli: {'yes' if compression.brotli is not None else 'no'})")
+    print(f"{'path':<16} {'ms/10k rows':>12} {'speedup':>8} {'bytes':>10}")
+    for name, (data, ms) in results.items():
+        speedup = f"{baseline / ms:.1f}x" if name in ("fastapi_default", "stdlib_json", "fast_path") else ""
+        print(f"{name:<16} {ms * scale:>12.2f} {speedup:>8} {len(data):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+업로드 처리 경로의 요청당 메모리 피크를 측정한다 (tracemalloc 기준, Python 할당만).
+
+    cd apps/backend
+    python app/scripts/bench-upload-memory.py [--size-mb 10]
+
+둘 다 요청 본문을 RECEIVE_CHUNK 씩 받는 것부터 측정한다 (uvicorn 이 http.request 메시지로 넘기는 것과 같음).
+- before: request.form() (Starlette 가 전부 spool) -> image.read() -> save_uploaded_image(bytes) -> image_to_base64(path)
+- after : receive_upload (받으면서 sha256 + 크기 확인, spool 버퍼 하나) -> save_uploaded_file(buffer) -> encode_image_file(buffer)
+ingest 열은 본문 수신이 끝날 때까지의 피크: after 는 업로드 크기와 상관없이 청크 + spool 버퍼(1 MB) 수준이어야 한다.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Tuple
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from starlette.requests import Request
+
+from app.services.gemini_frame_service import GeminiFrameService
+from app.services.uploads import receive_upload
+
+RECEIVE_CHUNK = 64 * 1024
+BOUNDARY = b"bench-boundary"
+
+
+def make_body(size: int, directory: str) -> str:
+    """multipart 본문을 디스크에 만들어 둔다 (측정 중에는 청크 단위로만 읽음)"""
+    path = os.path.join(directory, "body.multipart")
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for name, value in (("university_name", b"Harvard"), ("university_mascot", b"Crimson")):
+            f.write(b"--%s\r\nContent-Disposition: form-data; name=\"%s\"\r\n\r\n%s\r\n" % (BOUNDARY, name.encode(), value))
+        f.write(b"--%s\r\nContent-Disposition: form-data; name=\"image\"; filename=\"photo.jpg\"\r\n"
+                b"Content-Type: image/jpeg\r\n\r\n" % BOUNDARY)
+        written = 0
+        while written < size:
+            n = min(len(block), size - written)
+            f.write(block[:n])
+            written += n
+        f.write(b"\r\n--%s--\r\n" % BOUNDARY)
+    return path
+
+
+def make_request(body_path: str) -> Request:
+    body = open(body_path, "rb")
+
+    async def receive():
+        chunk = body.read(RECEIVE_CHUNK)
+        if not chunk:
+            body.close()
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunk)}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/gemini-frames/",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY),
+                    (b"content-length", str(os.path.getsize(body_path)).encode())],
+    }
+    return Request(scope, receive)
+
+
+async def before(service: GeminiFrameService, request: Request) -> Tuple[str, int]:
+    form = await request.form()
+    ingest_peak = tracemalloc.get_traced_memory()[1]
+    image_data = await form["image"].read()
+    image_path = service.save_uploaded_image(image_data)
+    service.encode_image(image_path)
+    await form.close()
+    return image_path, ingest_peak
+
+
+async def after(service: GeminiFrameService, request: Request) -> Tuple[str, int]:
+    _, upload = await receive_upload(request, max_bytes=1 << 40)
+    ingest_peak = tracemalloc.get_traced_memory()[1]
+    image_path = service.save_uploaded_file(upload.file, upload.sha256)
+    service.encode_image_file(upload.file)
+    upload.close()
+    return image_path, ingest_peak
+
+
+def measure(name, fn, service, body_path, size):
+    request = make_request(body_path)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    path, ingest_peak = asyncio.run(fn(service, request))
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    os.remove(path)
+    print(f"{name:<7} ingest={ingest_peak / 1e6:6.1f} MB  peak={peak / size:5.2f}x upload ({peak / 1e6:7.1f} MB)"
+          f"  time={elapsed * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory per upload request, before vs after streaming ingestion")
+    parser.add_argument("--size-mb", type=float, default=10)
+    args = parser.parse_args()
+    size = int(args.size_mb * 1024 * 1024)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = GeminiFrameService(upload_dir=tmp, output_dir=tmp, api_key="bench")
+        body_path = make_body(size, tmp)
+        print(f"upload size: {size / 1e6:.1f} MB")
+        measure("before", before, service, body_path, size)
+        measure("after", after, service, body_path, size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+R2 원본 프레임 이미지의 WebP 썸네일을 증분 생성한다.
+
+    cd apps/backend
+    python app/scripts/generate-thumbnails.py [--prefix "Carnegie Mellon University/"] [--processes 4]
+
+키 규칙: '<folder>/1.png' -> '<folder>/thumbs/1-<width>w.webp'
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.services.thumbnail_service import generate_thumbnails, THUMB_WIDTHS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate WebP thumbnails for frame images in R2")
+    parser.add_argument("--prefix", default="", help="only process keys under this prefix")
+    parser.add_argument("--widths", default=None, help="comma separated widths (default: THUMB_WIDTHS)")
+    parser.add_argument("--processes", type=int, default=None, help="resize worker processes (default: CPU count)")
+    parser.add_argument("--io-workers", type=int, default=8, help="concurrent R2 downloads/uploads")
+    args = parser.parse_args()
+
+    widths = tuple(sorted({int(w) for w in args.widths.split(",")})) if args.widths else THUMB_WIDTHS
+    started = time.perf_counter()
+    stats = generate_thumbnails(args.prefix, widths=widths, processes=args.processes, io_workers=args.io_workers)
+    elapsed = time.perf_counter() - started
+    print(f"sources={stats['sources']} thumbnails={stats['thumbnails']} failed={stats['failed']} "
+          f"widths={list(widths)} elapsed={elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
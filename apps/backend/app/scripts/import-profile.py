@@ -0,0 +1,80 @@
+"""
+main.py 의 import 시간을 측정해서 보고한다 (python -X importtime 기반).
+
+    cd apps/backend
+    python app/scripts/import-profile.py [--top 20] [--budget-ms 800] [--runs 3] [--json]
+
+--budget-ms 를 주면 중앙값이 예산을 넘을 때 exit code 1 로 끝난다 (CI에서 startup 예산 추적용).
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def profile_once(module: str):
+    """한 번 새 인터프리터로 import 하고 [(module, self_us, cumulative_us, depth)] 반환."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the backend app")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20, help="show the N slowest modules by cumulative time")
+    parser.add_argument("--runs", type=int, default=3, help="take the median over N fresh interpreters")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if the total exceeds this budget")
+    parser.add_argument("--json", action="store_true", help="machine readable output")
+    args = parser.parse_args()
+
+    runs = [profile_once(args.module) for _ in range(args.runs)]
+    totals = [next(cum for name, _, cum, _ in rows if name == args.module) / 1000 for rows in runs]
+    total_ms = statistics.median(totals)
+
+    # 가장 대표적인(중앙값) 실행 기준으로 상위 모듈 표시
+    rows = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    slowest = sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]
+    app_modules = sorted((r for r in rows if r[0].startswith("app.") or r[0] == args.module),
+                         key=lambda r: r[2], reverse=True)
+
+    if args.json:
+        print(json.dumps({
+            "module": args.module,
+            "total_ms": round(total_ms, 1),
+            "runs_ms": [round(t, 1) for t in totals],
+            "budget_ms": args.budget_ms,
+            "slowest": [{"module": n, "self_ms": s / 1000, "cumulative_ms": c / 1000} for n, s, c, _ in slowest],
+        }, indent=2))
+    else:
+        print(f"import {args.module}: {total_ms:.1f} ms (median of {args.runs}: {', '.join(f'{t:.0f}' for t in totals)})")
+        print(f"\n{'cumulative ms':>14} {'self ms':>9}  module (top {args.top})")
+        for name, self_us, cum_us, depth in slowest:
+            print(f"{cum_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {'  ' * depth}{name}")
+        print(f"\n{'cumulative ms':>14} {'self ms':>9}  app modules")
+        for name, self_us, cum_us, _ in app_modules:
+            print(f"{cum_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\nOver budget: {total_ms:.1f} ms > {args.budget_ms:.1f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+SQLite 의 프레임 카탈로그를 버전이 붙은 gzip JSON 으로 R2 에 올린다.
+
+    cd apps/backend
+    python app/scripts/publish-catalog.py [--force] [--out catalog.json.gz]
+
+- '<CATALOG_PREFIX>/catalog-<version>.json.gz' (immutable) 와 '<CATALOG_PREFIX>/latest.json' 포인터를 씀
+- DB 내용 버전이 latest 와 같으면 아무것도 올리지 않음 (--force 로 강제)
+- --out 을 주면 R2 에 올리지 않고 로컬 파일로만 저장
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.services.catalog_manifest import build_manifest, encode_manifest, publish_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the frame catalog manifest to R2")
+    parser.add_argument("--force", action="store_true", help="upload even if the content version did not change")
+    parser.add_argument("--out", default=None, help="write the gzip manifest to this path instead of uploading")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.out:
+        manifest = build_manifest()
+        data = encode_manifest(manifest)
+        Path(args.out).write_bytes(data)
+        result = {"version": manifest["version"], "path": args.out, "bytes": len(data),
+                  "universities": len(manifest["universities"])}
+    else:
+        result = publish_catalog(force=args.force)
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
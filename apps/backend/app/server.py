@@ -0,0 +1,52 @@
+import asyncio
+import signal
+import sys
+import threading
+from types import FrameType
+from typing import Optional
+
+import uvicorn
+from gunicorn.arbiter import Arbiter
+from uvicorn.workers import UvicornWorker
+
+from app.services.lifecycle import lifecycle
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    SIGTERM/SIGINT 를 받으면 바로 멈추지 않고 먼저 drain 하는 uvicorn 서버.
+    - 신호를 받는 즉시 draining: /ready 는 503 draining, 새 생성 요청은 503, 나머지 요청은 정상 처리
+    - 진행 중인 생성이 끝나면(최대 DRAIN_TIMEOUT_SECONDS) 원래대로 종료 (요청 수신 중단 -> 열린 연결 마무리)
+    - 두 번째 신호는 기다리지 않고 바로 종료로 넘김 (Ctrl+C 두 번 = 강제 종료)
+    lifespan shutdown 은 연결이 모두 끝난 뒤에야 실행되므로 거기서 drain 하면 너무 늦다.
+    """
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        if lifecycle.draining or self.should_exit:
+            super().handle_exit(sig, frame)
+            return
+        print(f"Shutdown signal received; draining {lifecycle.inflight} generation(s) before stopping")
+        lifecycle.begin_drain()
+
+        def drain_then_exit():
+            lifecycle.wait_idle()
+            # should_exit 만 켜면 uvicorn 의 main loop 가 다음 tick 에 종료를 시작한다
+            super(DrainingServer, self).handle_exit(sig, frame)
+
+        threading.Thread(target=drain_then_exit, name="drain", daemon=True).start()
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    """DrainingServer 로 서비스하는 gunicorn 워커 (gunicorn.conf.py 의 worker_class)"""
+
+    def run(self) -> None:
+        return asyncio.run(self._serve_draining())
+
+    async def _serve_draining(self) -> None:
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        # gunicorn 의 SIGQUIT(즉시 종료)은 drain 없이 그대로
+        asyncio.get_running_loop().add_signal_handler(signal.SIGQUIT, self.handle_exit, signal.SIGQUIT, None)
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# 다른 워커/프로세스의 쓰기는 여기서 무효화되지 않으므로, 최대 이 시간(초)까지만 캐시를 신뢰
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+
+try:
+    # orjson 은 dict/list 를 C 에서 바로 UTF-8 bytes 로 인코딩 (stdlib json 대비 ~5-10배)
+    import orjson
+except ImportError:  # pragma: no cover - requirements.txt 에 있지만 없는 환경에서도 동작하도록
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    FastAPI JSONResponse 와 같은 형식(UTF-8, 공백 없음)으로 직렬화.
+    DB 에서 읽은 값(str/int/None/dict/list)만 넣는다는 전제로 Pydantic 검증/jsonable_encoder 를 거치지 않음.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class CatalogCache:
+    """
+    프레임 카탈로그 읽기용 in-process read-through 캐시.
+    - 대학별 프레임 목록, frame id 별 프레임, "프레임이 있는 대학" 목록을 보관
+    - 응답 본문을 미리 직렬화해서 들고 있으므로 hit 시 SQL 과 JSON 인코딩을 모두 건너뜀
+    - frames 를 쓰는 곳(CRUD, upsert_frame, 썸네일 생성)에서 invalidate_* 를 호출해 정확히 무효화
+    """
+
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # 무효화될 때마다 증가. 로딩 중에 무효화가 끼어들면 그 결과는 저장하지 않음
+        self._generation = 0
+        self._universities: Optional[Tuple[float, List[Dict[str, Any]], bytes]] = None
+        self._by_university: Dict[int, Tuple[float, List[Dict[str, Any]], bytes]] = {}
+        self._by_frame: Dict[int, Tuple[float, int, bytes]] = {}
+        self._frames_of_university: Dict[int, Set[int]] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _fresh(self, stored_at: float) -> bool:
+        return time.monotonic() - stored_at < self.ttl
+
+    def _hit(self, entry) -> bool:
+        if entry is not None and self._fresh(entry[0]):
+            self.stats["hits"] += 1
+            return True
+        self.stats["misses"] += 1
+        return False
+
+    # ---------- reads ----------
+    def universities(self, loader: Callable[[], List[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], bytes]:
+        with self._lock:
+            entry = self._universities
+            if self._hit(entry):
+                return entry[1], entry[2]
+            generation = self._generation
+        rows = loader()
+        body = dumps(rows)
+        with self._lock:
+            if generation == self._generation:
+                self._universities = (time.monotonic(), rows, body)
+        return rows, body
+
+    def frames_for_university(self, university_id: int,
+                              loader: Callable[[int], List[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], bytes]:
+        with self._lock:
+            entry = self._by_university.get(university_id)
+            if self._hit(entry):
+                return entry[1], entry[2]
+            generation = self._generation
+        frames = loader(university_id)
+        body = dumps(frames)
+        with self._lock:
+            if generation == self._generation:
+                self._by_university[university_id] = (time.monotonic(), frames, body)
+        return frames, body
+
+    def frame(self, frame_id: int, loader: Callable[[int], Optional[Dict[str, Any]]]) -> Optional[bytes]:
+        with self._lock:
+            entry = self._by_frame.get(frame_id)
+            if self._hit(entry):
+                return entry[2]
+            generation = self._generation
+        row = loader(frame_id)
+        if row is None:
+            return None
+        body = dumps(row)
+        with self._lock:
+            if generation == self._generation:
+                uid = row["university_id"]
+                self._by_frame[frame_id] = (time.monotonic(), uid, body)
+                self._frames_of_university.setdefault(uid, set()).add(frame_id)
+        return body
+
+    # ---------- invalidation ----------
+    def invalidate_university(self, *university_ids: int) -> None:
+        """해당 대학의 프레임 목록 / 프레임들 / 대학 목록을 무효화"""
+        with self._lock:
+            self._generation += 1
+            self.stats["invalidations"] += 1
+            self._universities = None
+            for uid in university_ids:
+                self._by_university.pop(uid, None)
+                for fid in self._frames_of_university.pop(uid, set()):
+                    self._by_frame.pop(fid, None)
+
+    def invalidate_frame(self, frame_id: int, *university_ids: Optional[int]) -> None:
+        """프레임 하나와 그 프레임이 속했던/속하게 된 대학들을 무효화 (None 은 무시)"""
+        with self._lock:
+            entry = self._by_frame.pop(frame_id, None)
+        uids = {uid for uid in university_ids if uid is not None}
+        if entry is not None:
+            uids.add(entry[1])
+        self.invalidate_university(*uids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.stats["invalidations"] += 1
+            self._universities = None
+            self._by_university.clear()
+            self._by_frame.clear()
+            self._frames_of_university.clear()
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            body_bytes = sum(len(e[2]) for e in self._by_university.values()) \
+                + sum(len(e[2]) for e in self._by_frame.values()) \
+                + (len(self._universities[2]) if self._universities else 0)
+            return {
+                **self.stats,
+                "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else None,
+                "entries": {
+                    "universities": 1 if self._universities else 0,
+                    "by_university": len(self._by_university),
+                    "by_frame": len(self._by_frame),
+                },
+                # 직렬화된 본문 크기 (파싱된 리스트도 같이 들고 있으므로 실제 사용량은 대략 2~3배)
+                "body_bytes": body_bytes,
+                "ttl_seconds": self.ttl,
+            }
+
+
+# Create a singleton instance
+catalog_cache = CatalogCache()
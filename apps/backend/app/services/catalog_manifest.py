@@ -0,0 +1,119 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.r2_client import get_object_if_changed, put_object_bytes, public_url_for_key
+from app.services.database import database
+from app.services.repository import frames_repo, thumbnails_repo
+
+# 버킷 안의 카탈로그 위치. '_' 로 시작하는 폴더는 대학 폴더 목록/동기화에서 제외됨
+CATALOG_PREFIX = os.getenv("CATALOG_PREFIX", "_catalog").strip("/")
+CATALOG_LATEST_KEY = f"{CATALOG_PREFIX}/latest.json"
+# 버전별 파일은 내용이 바뀌지 않으므로 immutable, latest 포인터만 짧게 캐시
+CATALOG_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CATALOG_LATEST_CACHE_CONTROL = os.getenv("CATALOG_LATEST_CACHE_CONTROL", "public, max-age=60")
+MANIFEST_SCHEMA = 1
+
+
+def catalog_key(version: str) -> str:
+    return f"{CATALOG_PREFIX}/catalog-{version}.json.gz"
+
+
+CatalogRows = Tuple[List[tuple], List[tuple], List[tuple]]
+
+
+def _read_catalog_rows() -> CatalogRows:
+    database.run_sync(thumbnails_repo.ensure_table())
+    return database.run_sync(frames_repo.catalog_rows())
+
+
+def content_version(rows: CatalogRows) -> str:
+    """카탈로그에 들어가는 행들만으로 계산한 해시. DB 의 다른 테이블이 바뀌어도 버전은 그대로."""
+    h = hashlib.sha256(f"schema={MANIFEST_SCHEMA}\n".encode())
+    for table in rows:
+        for r in table:
+            h.update(json.dumps(r, ensure_ascii=False).encode("utf-8"))
+            h.update(b"\n")
+        h.update(b"--\n")
+    return h.hexdigest()[:16]
+
+
+def build_manifest(rows: Optional[CatalogRows] = None) -> Dict[str, Any]:
+    """
+    DB 에서 카탈로그(대학 + 프레임 URL + srcset)를 만든다.
+    응답 형식은 /frames/universities, /frames/by-id 와 같은 필드를 사용.
+    """
+    rows = rows or _read_catalog_rows()
+    universities, frames, thumbs = rows
+
+    srcsets: Dict[str, Dict[str, str]] = {}
+    for source_url, width, r2_url in thumbs:
+        srcsets.setdefault(source_url, {})[f"{width}w"] = r2_url
+    by_university: Dict[int, List[Dict[str, Any]]] = {}
+    for frame_id, university_id, r2_url, filename, sort_order in frames:
+        by_university.setdefault(university_id, []).append({
+            "id": frame_id,
+            "filename": filename,
+            "r2_url": r2_url,
+            "sort_order": sort_order,
+            "srcset": srcsets.get(r2_url, {}),
+        })
+
+    return {
+        "schema": MANIFEST_SCHEMA,
+        "version": content_version(rows),
+        "generated_at": int(time.time()),
+        "universities": [
+            {"id": uid, "name": name, "frames": by_university.get(uid, [])}
+            for uid, name in universities
+        ],
+    }
+
+
+def encode_manifest(manifest: Dict[str, Any]) -> bytes:
+    body = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # mtime=0: 같은 내용이면 압축 결과도 같은 바이트
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def read_latest_pointer() -> Optional[Dict[str, Any]]:
+    try:
+        resp = get_object_if_changed(CATALOG_LATEST_KEY)
+    except KeyError:
+        return None  # 처음 배포할 때는 포인터가 없음
+    return json.loads(resp["Body"].read())
+
+
+def publish_catalog(force: bool = False) -> Dict[str, Any]:
+    """
+    카탈로그를 gzip JSON 으로 버킷에 올리고 latest 포인터를 갱신.
+    DB 내용 버전이 latest 와 같으면 (force 가 아닌 한) 아무것도 올리지 않음.
+    순서: 버전 파일 -> 포인터. 포인터는 항상 이미 존재하는 파일만 가리킨다.
+    """
+    rows = _read_catalog_rows()
+    version = content_version(rows)
+    latest = read_latest_pointer()
+    if latest and latest.get("version") == version and not force:
+        return {"published": False, "version": version, "url": latest.get("url")}
+
+    manifest = build_manifest(rows)
+    data = encode_manifest(manifest)
+    key = catalog_key(version)
+    put_object_bytes(key, data, "application/json", cache_control=CATALOG_CACHE_CONTROL, content_encoding="gzip")
+
+    pointer = {
+        "schema": MANIFEST_SCHEMA,
+        "version": version,
+        "key": key,
+        "url": public_url_for_key(key),
+        "generated_at": manifest["generated_at"],
+        "universities": len(manifest["universities"]),
+        "frames": sum(len(u["frames"]) for u in manifest["universities"]),
+        "bytes": len(data),
+    }
+    put_object_bytes(CATALOG_LATEST_KEY, json.dumps(pointer).encode("utf-8"), "application/json",
+                     cache_control=CATALOG_LATEST_CACHE_CONTROL)
+    return {"published": True, "previous_version": latest.get("version") if latest else None, **pointer}
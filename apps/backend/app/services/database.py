@@ -0,0 +1,131 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Optional, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+class Database:
+    """
+    DATABASE_URL 하나에 대한 async 엔진 + 커넥션 풀.
+
+    엔진(특히 asyncpg 풀)은 생성된 이벤트 루프에 묶이므로, 전용 스레드의 루프 하나에서만 사용한다.
+    - async 코드: await db.run(coro)        (uvicorn 루프는 블로킹되지 않음)
+    - sync 코드 : db.run_sync(coro)        (스레드풀/워밍업/스크립트에서 결과를 기다림)
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.dialect = url.split("://", 1)[0].split("+", 1)[0]
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._engine = None
+
+    # ---------- loop / engine ----------
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="db-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _create_engine(self):
+        # sqlalchemy 의 async 확장은 import 가 무거우므로 처음 쓸 때 로드
+        from sqlalchemy import event
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        if self.dialect == "sqlite":
+            # 기본값(NullPool)은 쿼리마다 커넥션(+aiosqlite 스레드)을 새로 만들므로 작은 풀을 유지
+            from sqlalchemy.pool import AsyncAdaptedQueuePool
+            engine = create_async_engine(self.url, poolclass=AsyncAdaptedQueuePool,
+                                         pool_size=settings.DB_POOL_SIZE, max_overflow=0,
+                                         pool_timeout=settings.DB_POOL_TIMEOUT)
+
+            @event.listens_for(engine.sync_engine, "connect")
+            def _sqlite_pragmas(dbapi_con, _):
+                cur = dbapi_con.cursor()
+                cur.execute("PRAGMA foreign_keys=ON")
+                cur.close()
+            return engine
+        return create_async_engine(
+            self.url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+    @property
+    def engine(self):
+        """DB 루프 안에서만 사용할 것"""
+        if self._engine is None:
+            self._engine = self._create_engine()
+        return self._engine
+
+    def submit(self, coro: Awaitable[T]) -> "Future[T]":
+        return asyncio.run_coroutine_threadsafe(coro, self._start())
+
+    async def run(self, coro: Awaitable[T]) -> T:
+        loop = self._start()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def run_sync(self, coro: Awaitable[T]) -> T:
+        return self.submit(coro).result()
+
+    # ---------- schema / stats ----------
+    async def create_schema(self) -> None:
+        from app.models import Base
+        async with self.engine.begin() as con:
+            await con.run_sync(Base.metadata.create_all)
+
+    async def ping(self) -> None:
+        """SELECT 1 (/ready 의 의존성 검사용)"""
+        from sqlalchemy import text
+        async with self.engine.connect() as con:
+            await con.execute(text("SELECT 1"))
+
+    def pool_status(self) -> Any:
+        if self._engine is None:
+            return None
+        return self._engine.pool.status()
+
+    async def dispose(self) -> None:
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+    def close(self) -> None:
+        """풀을 정리하고 DB 루프를 멈춤 (종료 시)"""
+        if self._loop is None:
+            return
+        try:
+            self.run_sync(self.dispose())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+
+database = Database(settings.DATABASE_URL)
+
+
+# fork 전에 만들어진 엔진. 자식에서 GC 되면 asyncpg 가 부모와 공유하는 소켓을 끊으므로 참조를 유지한다
+_inherited = []
+
+
+def _reset_after_fork() -> None:
+    # gunicorn preload_app 등으로 fork 된 자식은 부모의 루프 스레드를 물려받지 못하므로 새로 시작
+    database._loop = None
+    if database._engine is not None:
+        _inherited.append(database._engine)
+    database._engine = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,12 +1,26 @@
+import io
 import os
 import uuid
 import base64
-import requests
+import hashlib
 import json
-from typing import Optional
-from PIL import Image
-from io import BytesIO
-from dotenv import load_dotenv
+import shutil
+import threading
+from typing import BinaryIO, Optional, Tuple, Union
+
+from app.services.gemini_stream import InlineImageDecoder
+from app.services.photo_dedupe import PhotoSignature, photo_signature
+from app.services.rate_limiter import RateLimiter, gemini_rate_limiter, GEMINI_RATE_LIMIT_MAX_WAIT
+
+# Bytes read from the Gemini response per iteration
+STREAM_CHUNK_SIZE = 64 * 1024
+# How long every caller pauses after Gemini answers 429 without a Retry-After header
+GEMINI_429_BACKOFF_SECONDS = float(os.getenv("GEMINI_429_BACKOFF_SECONDS", "10"))
+
+DEFAULT_OUTPUT_REQUIREMENT = (
+    "Output format requirement: Return only the final image as a PNG data URI in the response text "
+    "(for example: data:image/png;base64,<BASE64>). Do not include any additional commentary or markdown."
+)
 
 class GeminiAPIError(Exception):
     """Raised when the Gemini API returns a non-success response."""
@@ -17,22 +31,115 @@ class GeminiAPIError(Exception):
         self.message = message
         self.raw = raw
 
-# Load environment variables
-load_dotenv()
 
-# Get API key from environment variables
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable is not set")
+class GenerationCancelled(Exception):
+    """Raised when the caller set the ``cancel`` event (e.g. the client disconnected) before the result was read."""
+
+_EXTENSIONS = {"image/png": "png", "image/webp": "webp", "image/gif": "gif"}
+
+
+class _HashingBuffer(io.BytesIO):
+    """In-memory decode target that hashes while it is written (reset by truncate, as the decoder does)"""
+
+    def __init__(self):
+        super().__init__()
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.sha256.update(data)
+        return super().write(data)
+
+    def truncate(self, size=None) -> int:
+        self.sha256 = hashlib.sha256()
+        return super().truncate(size)
+
+
+class _MemoryReader(io.RawIOBase):
+    """Seekable file object over a memoryview; reads copy only the requested range"""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+class GeneratedImage:
+    """
+    A generated frame held in memory, with its content hash (for content-addressed storage).
+    ``data`` may be a memoryview over the decode buffer, so the decoded image is never copied
+    just to hand it over; every consumer reads through that one view.
+    """
+
+    def __init__(self, data: Union[bytes, memoryview], mime_type: str, sha256: str):
+        self.data = memoryview(data)
+        self.mime_type = mime_type
+        self.sha256 = sha256
+
+    @property
+    def ext(self) -> str:
+        return _EXTENSIONS.get(self.mime_type, "jpg")
+
+    @property
+    def size(self) -> int:
+        return self.data.nbytes
+
+    def open(self) -> BinaryIO:
+        """A fresh reader per consumer (shares the buffer, not the file position)"""
+        return io.BufferedReader(_MemoryReader(self.data))
+
+    def data_uri(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+    def save_to(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.sha256}.{self.ext}")
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self.data)
+            os.replace(tmp_path, path)
+        return path
+
 
 class GeminiFrameService:
-    def __init__(self, upload_dir: str = "uploads", output_dir: str = "outputs"):
-        # Create directories if they don't exist
+    def __init__(self, upload_dir: str = "uploads", output_dir: Optional[str] = "outputs", api_key: Optional[str] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 rate_limit_wait: Optional[float] = GEMINI_RATE_LIMIT_MAX_WAIT):
+        # Get API key from environment variables (checked when the service is first built, not at import)
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is not set")
+
+        # Create directories if they don't exist (output_dir=None: results are only kept in memory)
         self.upload_dir = upload_dir
         self.output_dir = output_dir
         os.makedirs(upload_dir, exist_ok=True)
-        os.makedirs(output_dir, exist_ok=True)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
         
+        # Shared per-process limiter; rate_limit_wait=None waits as long as needed (offline jobs)
+        self.rate_limiter = rate_limiter or gemini_rate_limiter
+        self.rate_limit_wait = rate_limit_wait
+
         # Gemini API endpoint
         self.api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-image-preview:generateContent"
     
@@ -46,39 +153,122 @@ class GeminiFrameService:
         
         return file_path
     
+    def save_uploaded_file(self, fileobj: BinaryIO, content_hash: Optional[str] = None) -> str:
+        """Stream an uploaded file object to disk (named by content hash when given) and rewind it"""
+        filename = f"{content_hash or uuid.uuid4()}.jpg"
+        file_path = os.path.join(self.upload_dir, filename)
+
+        # Same content already on disk: nothing to write
+        if not (content_hash and os.path.exists(file_path)):
+            tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(fileobj, f, 256 * 1024)
+            os.replace(tmp_path, file_path)
+        fileobj.seek(0)
+        return file_path
+
+    def encode_image_file(self, fileobj: BinaryIO, mime_type: Optional[str] = None) -> Tuple[str, str]:
+        """Like encode_image, but from an open (spooled) file object; reads it once in chunks and rewinds it
+
+        Pass ``mime_type`` (from inspect_image_file) to skip the Pillow format detection.
+        """
+        if mime_type is None:
+            mime_type = self._detect_mime_type(fileobj)
+        fileobj.seek(0)
+        encoded = bytearray()
+        # Multiple of 3 so the chunks concatenate into valid base64 without padding in between
+        while True:
+            chunk = fileobj.read(3 * 64 * 1024)
+            if not chunk:
+                break
+            encoded += base64.b64encode(chunk)
+        fileobj.seek(0)
+        return encoded.decode("ascii"), mime_type
+
     def image_to_base64(self, image_path: str) -> str:
         """Convert an image to base64 string"""
         with open(image_path, "rb") as img_file:
             return base64.b64encode(img_file.read()).decode('utf-8')
 
-    def _detect_mime_type(self, image_path: str) -> str:
+    def _detect_mime_type(self, image_path: Union[str, BinaryIO]) -> str:
         """Best-effort detection of image mime type from contents.
 
         Defaults to image/jpeg if not detectable.
         """
+        return self._inspect_image(image_path, with_phash=False)[0]
+
+    def inspect_image_file(self, fileobj: BinaryIO) -> Tuple[str, Optional[PhotoSignature]]:
+        """(mime type, photo signature) from a single Pillow decode; rewinds the file object
+
+        The signature (dHash + confirming signals) is used to spot near-duplicate uploads; None if the image
+        can't be decoded or carries too little detail to tell photos apart (flat or low-texture images).
+        """
+        try:
+            return self._inspect_image(fileobj, with_phash=True)
+        finally:
+            fileobj.seek(0)
+
+    def _inspect_image(self, image_path: Union[str, BinaryIO],
+                       with_phash: bool) -> Tuple[str, Optional[PhotoSignature]]:
+        from PIL import Image
         try:
             with Image.open(image_path) as img:
                 fmt = (img.format or "JPEG").upper()
                 if fmt == "PNG":
-                    return "image/png"
-                if fmt == "WEBP":
-                    return "image/webp"
-                if fmt == "GIF":
-                    return "image/gif"
-                # Default to JPEG for others (including JPEG/JPG)
-                return "image/jpeg"
+                    mime_type = "image/png"
+                elif fmt == "WEBP":
+                    mime_type = "image/webp"
+                elif fmt == "GIF":
+                    mime_type = "image/gif"
+                else:
+                    # Default to JPEG for others (including JPEG/JPG)
+                    mime_type = "image/jpeg"
+                phash = None
+                if with_phash:
+                    try:
+                        phash = photo_signature(img)
+                    except Exception:
+                        # Truncated/odd files: still generate, just without dedupe
+                        phash = None
+                return mime_type, phash
         except Exception:
-            return "image/jpeg"
+            return "image/jpeg", None
+
+    def encode_image(self, image_path: str) -> Tuple[str, str]:
+        """Read an image once and return (base64 data, mime type) for reuse across several generations"""
+        return self.image_to_base64(image_path), self._detect_mime_type(image_path)
+
+    def create_frame_with_gemini(self, image_path: str, university_name: str, university_mascot: str,
+                                 encoded: Optional[Tuple[str, str]] = None,
+                                 prompt: Optional[str] = None) -> Optional[str]:
+        """Like generate_frame, but writes the result to output_dir and returns its path"""
+        generated = self.generate_frame(image_path, university_name, university_mascot, encoded, prompt)
+        if generated is None:
+            return None
+        return generated.save_to(self.output_dir or "outputs")
 
-    def create_frame_with_gemini(self, image_path: str, university_name: str, university_mascot: str) -> Optional[str]:
-        """Create a profile picture frame using Gemini API"""
+    def generate_frame(self, image_path: str, university_name: str, university_mascot: str,
+                       encoded: Optional[Tuple[str, str]] = None,
+                       prompt: Optional[str] = None,
+                       cancel: Optional[threading.Event] = None) -> Optional[GeneratedImage]:
+        """Create a profile picture frame using Gemini API
+
+        Pass ``encoded`` (from encode_image) to skip re-reading and re-encoding the photo.
+        Pass ``prompt`` to replace the built-in instructions (the output format requirement is appended).
+        Pass ``cancel`` to abandon the call: it is checked before the request is sent and between streamed
+        chunks (raises GenerationCancelled). Once the request has been sent, Gemini still bills it.
+        The image is decoded into memory and hashed on the way; nothing is written to disk.
+        """
+        import requests
         try:
             # Read the image and convert to base64
-            image_base64 = self.image_to_base64(image_path)
-            mime_type = self._detect_mime_type(image_path)
+            image_base64, mime_type = encoded or self.encode_image(image_path)
             
             # Construct the prompt
-            prompt = f"""Create a circular banner frame around the face in this photo to make it suitable as a social media profile picture.
+            if prompt:
+                prompt = f"{prompt.strip()}\n\n{DEFAULT_OUTPUT_REQUIREMENT}"
+            else:
+                prompt = f"""Create a circular banner frame around the face in this photo to make it suitable as a social media profile picture.
             Use the official colors and mascot of {university_name} University in the design.
             The mascot is {university_mascot}.
             Ensure the frame highlights the school spirit but does not obstruct or crop the face.
@@ -112,11 +302,17 @@ class GeminiFrameService:
                 }
             }
             
-            # Make the API request
+            # Make the API request (after a token from the shared rate limiter)
+            if not self.rate_limiter.acquire(timeout=self.rate_limit_wait):
+                raise GeminiAPIError(code=429, status="RATE_LIMITED",
+                                     message="Too many Gemini requests from this server, please try again later.")
+            if cancel is not None and cancel.is_set():
+                raise GenerationCancelled("Generation cancelled before the request was sent")
             response = requests.post(
-                f"{self.api_url}?key={GEMINI_API_KEY}",
+                f"{self.api_url}?key={self.api_key}",
                 headers={"Content-Type": "application/json"},
-                data=json.dumps(payload)
+                data=json.dumps(payload),
+                stream=True,
             )
 
             # Check if the request was successful
@@ -137,55 +333,42 @@ class GeminiFrameService:
                     # Keep defaults; include raw text
                     pass
 
+                if response.status_code == 429:
+                    try:
+                        retry_after = float(response.headers.get("Retry-After", ""))
+                    except ValueError:
+                        retry_after = GEMINI_429_BACKOFF_SECONDS
+                    self.rate_limiter.backoff(retry_after)
                 raise GeminiAPIError(code=int(err_code), status=err_status, message=err_msg, raw=err_text)
             
-            # Parse the response
-            response_data = response.json()
-            
-            # Extract the generated image data
-            for candidate in response_data.get("candidates", []):
-                for part in candidate.get("content", {}).get("parts", []):
-                    # Case 1: Proper inline image under either inline_data or inlineData
-                    if isinstance(part, dict) and ("inline_data" in part or "inlineData" in part):
-                        inline = part.get("inline_data") or part.get("inlineData") or {}
-                        data_b64 = inline.get("data")
-                        if data_b64:
-                            generated_image_data = base64.b64decode(data_b64)
-                            mime = inline.get("mime_type") or inline.get("mimeType") or "image/jpeg"
-                            ext = "png" if mime.endswith("png") else ("webp" if mime.endswith("webp") else ("gif" if mime.endswith("gif") else "jpg"))
-                            result_filename = f"{uuid.uuid4()}.{ext}"
-                            result_path = os.path.join(self.output_dir, result_filename)
-                            with open(result_path, "wb") as f:
-                                f.write(generated_image_data)
-                            return result_path
-
-                    # Case 2: Some previews return a data-URI in text
-                    if isinstance(part, dict) and "text" in part and isinstance(part["text"], str):
-                        txt = part["text"]
-                        if "data:image/" in txt and ";base64," in txt:
-                            try:
-                                prefix, b64 = txt.split(",", 1)
-                                generated_image_data = base64.b64decode(b64)
-                                ext = "png" if "image/png" in prefix else "jpg"
-                                result_filename = f"{uuid.uuid4()}.{ext}"
-                                result_path = os.path.join(self.output_dir, result_filename)
-                                with open(result_path, "wb") as f:
-                                    f.write(generated_image_data)
-                                return result_path
-                            except Exception:
-                                pass
+            # Decode the image while the body streams in: base64 goes straight from the socket into
+            # one in-memory buffer (hashed as it is written), never the full JSON text or parsed dict
+            sink = _HashingBuffer()
+            try:
+                decoder = InlineImageDecoder(sink)
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    if cancel is not None and cancel.is_set():
+                        # Stop reading/decoding; closing the response drops the connection
+                        raise GenerationCancelled("Generation cancelled while the response was streaming")
+                    decoder.feed(chunk)
+            finally:
+                response.close()
+
+            if decoder.found:
+                mime = decoder.mime_type or "image/jpeg"
+                if mime not in _EXTENSIONS:
+                    mime = "image/jpeg"
+                # Hand over a view of the decode buffer instead of a copy (getvalue); the view keeps the
+                # buffer alive, so the sink is left open for the GeneratedImage
+                return GeneratedImage(sink.getbuffer(), mime, sink.sha256.hexdigest())
 
             # No usable image content detected; print small snippet for debugging
-            try:
-                snippet = json.dumps(response_data)[:500]
-                print("No image data found in the response. Snippet:", snippet)
-            except Exception:
-                print("No image data found in the response (could not serialize).")
+            snippet = decoder.head.decode("utf-8", "replace")
+            print("No image data found in the response. Snippet:", snippet)
             return None
             
         except Exception as e:
             # Let the caller decide how to map errors; don't swallow details
             raise
 
-# Create a singleton instance
-gemini_frame_service = GeminiFrameService()
+# No module-level instance: app.dependencies builds the service lazily on first use
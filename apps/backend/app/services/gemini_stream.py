@@ -0,0 +1,192 @@
+import re
+import base64
+import binascii
+from typing import BinaryIO, Optional
+
+_B64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+# Everything that is not base64 (whitespace, stray escapes) is dropped, like b64decode(validate=False)
+_B64_DELETE = bytes(b for b in range(256) if b not in _B64_ALPHABET)
+_JSON_ESCAPES = {ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t", ord("b"): b"\b", ord("f"): b"\f",
+                 ord("/"): b"/", ord('"'): b'"', ord("\\"): b"\\"}
+_DATA_URI_MIME = re.compile(rb"data:(image/[\w.+-]+)")
+_QUOTE, _BACKSLASH, _COLON = ord('"'), ord("\\"), ord(":")
+_WHITESPACE = b" \t\r\n"
+
+
+class InlineImageDecoder:
+    """
+    Incremental scanner for a Gemini generateContent JSON response.
+
+    Feed it the raw response body chunk by chunk. Base64 image data is decoded straight into
+    ``sink`` as it arrives, so the full JSON text, the parsed dict and the decoded image are
+    never in memory at the same time. Two shapes are recognized, as in the non-streaming parser:
+
+    - ``"inlineData": {"mimeType": ..., "data": "<base64>"}`` (or inline_data / mime_type)
+    - a ``"text"`` part holding a data URI: ``"data:image/png;base64,<base64>"``
+
+    Only the first image is decoded. Check ``found`` and ``mime_type`` after the last chunk.
+    """
+
+    CAPTURE_LIMIT = 512
+    HEAD_LIMIT = 500
+
+    def __init__(self, sink: BinaryIO):
+        self.sink = sink
+        self.found = False
+        self.mime_type: Optional[str] = None
+        self.bytes_written = 0
+        self.head = bytearray()  # first bytes of the body, for debugging when no image is found
+
+        self._in_string = False
+        self._role: Optional[str] = None  # "capture" | "skip" | "text" | "b64"
+        self._escape = False
+        self._unicode_skip = 0
+        self._capture = bytearray()
+        self._value_of: Optional[str] = None  # key this string is the value of (None for keys)
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._after_colon = False
+        self._pending = bytearray()  # base64 characters waiting for a full 4-char group
+        self._inline_mime: Optional[str] = None
+        self._text_mime: Optional[str] = None
+
+    # ---------- public ----------
+    def feed(self, chunk: bytes) -> None:
+        if len(self.head) < self.HEAD_LIMIT:
+            self.head += chunk[: self.HEAD_LIMIT - len(self.head)]
+        i, n = 0, len(chunk)
+        while i < n:
+            if self._in_string:
+                i = self._feed_string(chunk, i, n)
+                continue
+            c = chunk[i]
+            if c == _QUOTE:
+                self._start_string()
+            elif c == _COLON:
+                self._key = self._last_string
+                self._after_colon = True
+            elif c not in _WHITESPACE:
+                # '{', '[', ',', numbers, literals: the next string is no longer this key's value
+                self._after_colon = False
+            i += 1
+
+    # ---------- strings ----------
+    def _start_string(self) -> None:
+        self._in_string = True
+        self._escape = False
+        self._unicode_skip = 0
+        self._capture.clear()
+        if self._after_colon:
+            self._after_colon = False
+            key = self._value_of = self._key
+            if key == "data" and not self.found:
+                self._role = "b64"
+                self._text_mime = None
+            elif key == "text" and not self.found:
+                self._role = "text"
+            elif key in ("mimeType", "mime_type"):
+                self._role = "capture"
+            else:
+                self._role = "skip"
+        else:
+            self._value_of = None
+            self._role = "capture"
+
+    def _feed_string(self, chunk: bytes, i: int, n: int) -> int:
+        if self._unicode_skip:
+            take = min(self._unicode_skip, n - i)
+            self._unicode_skip -= take
+            return i + take
+        if self._escape:
+            self._escape = False
+            c = chunk[i]
+            if c == ord("u"):
+                self._unicode_skip = 4
+                self._consume(b"?")
+            else:
+                self._consume(_JSON_ESCAPES.get(c, b""))
+            return i + 1
+
+        quote = chunk.find(b'"', i)
+        backslash = chunk.find(b"\\", i, quote if quote >= 0 else n)
+        end = backslash if backslash >= 0 else (quote if quote >= 0 else n)
+        if end > i:
+            self._consume(chunk[i:end])
+        if end == n:
+            return n
+        if chunk[end] == _BACKSLASH:
+            self._escape = True
+        else:
+            self._end_string()
+        return end + 1
+
+    def _consume(self, segment: bytes) -> None:
+        role = self._role
+        if role == "b64":
+            self._write_b64(segment)
+        elif role == "capture":
+            room = self.CAPTURE_LIMIT - len(self._capture)
+            if room > 0:
+                self._capture += segment[:room]
+        elif role == "text":
+            # Collect up to the first comma, then decide whether this text is a data URI
+            comma = segment.find(b",")
+            if comma < 0:
+                self._capture += segment
+                if len(self._capture) > self.CAPTURE_LIMIT:
+                    self._role = "skip"
+                return
+            prefix = bytes(self._capture) + segment[:comma]
+            m = _DATA_URI_MIME.search(prefix)
+            if m and b";base64" in prefix:
+                self._role = "b64"
+                self._text_mime = m.group(1).decode("ascii")
+                self._write_b64(segment[comma + 1:])
+            else:
+                self._role = "skip"
+
+    def _end_string(self) -> None:
+        self._in_string = False
+        role = self._role
+        if role == "capture":
+            value = self._capture.decode("utf-8", "replace")
+            if self._value_of in ("mimeType", "mime_type"):
+                self._inline_mime = value
+                if self.found and self.mime_type is None:
+                    self.mime_type = value
+            elif self._value_of is None:
+                self._last_string = value
+        elif role == "b64":
+            self._flush_b64()
+            if self.bytes_written:
+                self.found = True
+                self.mime_type = self._text_mime or self._inline_mime
+        self._role = None
+
+    # ---------- base64 ----------
+    def _write_b64(self, segment: bytes) -> None:
+        self._pending += segment.translate(None, _B64_DELETE)
+        usable = len(self._pending) - len(self._pending) % 4
+        if usable:
+            self._decode(bytes(self._pending[:usable]))
+            del self._pending[:usable]
+
+    def _flush_b64(self) -> None:
+        if self._pending:
+            rest = bytes(self._pending)
+            self._pending.clear()
+            self._decode(rest + b"=" * (-len(rest) % 4))
+
+    def _decode(self, data: bytes) -> None:
+        try:
+            decoded = base64.b64decode(data)
+        except binascii.Error:
+            # Not valid base64 after all: drop what was written and skip the rest of this string
+            self.sink.seek(0)
+            self.sink.truncate()
+            self.bytes_written = 0
+            self._pending.clear()
+            self._role = "skip"
+            return
+        self.sink.write(decoded)
+        self.bytes_written += len(decoded)
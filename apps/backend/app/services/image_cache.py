@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional, Set, Tuple
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.r2_client import get_object_if_changed
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "image_cache")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024
+# 이 시간(초)이 지나면 다음 요청 때 R2에 ETag로 재검증
+IMAGE_CACHE_REVALIDATE_SECONDS = int(os.getenv("IMAGE_CACHE_REVALIDATE_SECONDS", "300"))
+_CHUNK = 256 * 1024
+# R2 에 없는 키(404)를 기억하는 최대 개수 (revalidate 주기 동안 다시 묻지 않음)
+_MISSING_MAX = 10000
+
+
+class ImageDiskCache:
+    """
+    R2 객체를 로컬 디스크에 캐시하는 read-through 캐시.
+    - 전체 크기 상한을 넘으면 가장 오래 쓰이지 않은 파일부터 삭제(LRU)
+    - revalidate 주기가 지나면 If-None-Match 로 R2에 재검증
+    - 같은 키에 대한 동시 miss 는 하나의 upstream fetch 로 합침
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, revalidate_after: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._inflight: Dict[str, Future] = {}
+        self._tasks: Set["asyncio.Task"] = set()
+        # key -> 404 를 받은 시각
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "coalesced": 0, "evictions": 0,
+                      "not_found": 0, "not_found_hits": 0}
+
+    def _paths(self, key: str):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, digest)
+        return base, base + ".json"
+
+    def _ensure_loaded(self) -> None:
+        """프로세스 시작 후 처음 한 번, 디스크에 남아있는 캐시 파일을 인덱스로 복원. (파일 수만큼 stat 하므로 스레드풀에서)"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            found = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                meta_path = os.path.join(self.cache_dir, name)
+                data_path = meta_path[:-len(".json")]
+                try:
+                    with open(meta_path) as f:
+                        meta = json.load(f)
+                    st = os.stat(data_path)
+                except (OSError, ValueError):
+                    continue
+                meta.update(path=data_path, size=st.st_size)
+                found.append((st.st_atime, meta))
+            for _, meta in sorted(found, key=lambda x: x[0]):
+                self._entries[meta["key"]] = meta
+                self._total_bytes += meta["size"]
+            self._loaded = True
+        self._evict()
+
+    def _touch(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _drop(self, entry: Dict[str, Any]) -> None:
+        """인덱스에 아직 이 항목이 있으면 빼고 파일을 지움 (R2 에서 사라진 객체)"""
+        with self._lock:
+            if self._entries.get(entry["key"]) is not entry:
+                return
+            del self._entries[entry["key"]]
+            self._total_bytes -= entry["size"]
+        for p in (entry["path"], entry["path"] + ".json"):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    def _remember_missing(self, key: str) -> None:
+        with self._lock:
+            self._missing[key] = time.time()
+            self._missing.move_to_end(key)
+            while len(self._missing) > _MISSING_MAX:
+                self._missing.popitem(last=False)
+            self.stats["not_found"] += 1
+
+    def _known_missing(self, key: str) -> bool:
+        with self._lock:
+            at = self._missing.get(key)
+            if at is None:
+                return False
+            if time.time() - at < self.revalidate_after:
+                self.stats["not_found_hits"] += 1
+                return True
+            del self._missing[key]
+            return False
+
+    def _evict(self) -> None:
+        victims = []
+        with self._lock:
+            # 방금 넣은 항목(맨 뒤)은 남겨둠
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, entry = self._entries.popitem(last=False)
+                self._total_bytes -= entry["size"]
+                victims.append(entry)
+            self.stats["evictions"] += len(victims)
+        for entry in victims:
+            for p in (entry["path"], entry["path"] + ".json"):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+    def _write_meta(self, entry: Dict[str, Any]) -> None:
+        meta = {k: entry[k] for k in ("key", "etag", "content_type", "checked_at")}
+        tmp = entry["path"] + ".json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, entry["path"] + ".json")
+
+    def _fetch(self, key: str, entry: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """(스레드풀에서 실행) R2에서 받아오거나 ETag로 재검증."""
+        try:
+            resp = get_object_if_changed(key, etag=entry["etag"] if entry else None)
+        except KeyError:
+            # 삭제된 객체: 캐시 파일을 지우고, revalidate 주기 동안은 R2 에 다시 묻지 않고 404
+            if entry is not None:
+                self._drop(entry)
+            self._remember_missing(key)
+            raise
+        if resp is None:
+            entry["checked_at"] = time.time()
+            self._write_meta(entry)
+            self.stats["revalidated"] += 1
+            return entry
+
+        data_path, _ = self._paths(key)
+        tmp = f"{data_path}.{threading.get_ident()}.tmp"
+        size = 0
+        with open(tmp, "wb") as f:
+            for chunk in resp["Body"].iter_chunks(_CHUNK):
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(tmp, data_path)
+        with self._lock:
+            self._missing.pop(key, None)
+
+        new_entry = {
+            "key": key,
+            "path": data_path,
+            "size": size,
+            "etag": resp.get("ETag", "").strip('"'),
+            "content_type": resp.get("ContentType") or "application/octet-stream",
+            "checked_at": time.time(),
+        }
+        self._write_meta(new_entry)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old["size"]
+            self._entries[key] = new_entry
+            self._total_bytes += size
+        self._evict()
+        return new_entry
+
+    async def get(self, key: str) -> Dict[str, Any]:
+        """캐시된 항목(path, size, etag, content_type)을 반환. 객체가 없으면 KeyError."""
+        if not self._loaded:
+            await run_in_threadpool(self._ensure_loaded)
+        if self._known_missing(key):
+            raise KeyError(key)
+        entry = self._touch(key)
+        if entry is not None and time.time() - entry["checked_at"] < self.revalidate_after:
+            self.stats["hits"] += 1
+            return entry
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = self._inflight[key] = Future()
+                # 요청과 분리된 task 로 받아옴: 먼저 온 클라이언트가 끊겨도 fetch 와 다른 대기자는 영향 없음
+                task = asyncio.ensure_future(self._fetch_shared(key, entry, inflight))
+                self._tasks.add(task)
+                task.add_done_callback(self._fetch_done)
+        if not owner:
+            self.stats["coalesced"] += 1
+            # shield: 대기자 하나가 취소돼도 공유 Future 가 취소되지 않도록
+            return await asyncio.shield(asyncio.wrap_future(inflight))
+
+        self.stats["misses"] += 1
+        return await asyncio.shield(task)
+
+    async def _fetch_shared(self, key: str, entry: Optional[Dict[str, Any]], inflight: Future) -> Dict[str, Any]:
+        try:
+            result = await run_in_threadpool(self._fetch, key, entry)
+        except Exception as e:
+            # 실제 fetch 오류(KeyError 등)만 대기자에게 전달
+            inflight.set_exception(e)
+            raise
+        else:
+            inflight.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            # 루프 종료 등으로 task 자체가 취소된 경우 대기자가 영원히 기다리지 않도록
+            if not inflight.done():
+                inflight.cancel()
+
+    async def open(self, key: str) -> Tuple[Dict[str, Any], BinaryIO, int]:
+        """
+        get() 후 캐시 파일을 열어서 (항목, 파일, 크기) 반환. 호출한 쪽이 파일을 닫는다.
+        get() 과 open 사이에 evict 로 파일이 지워졌으면 인덱스에서 빼고 한 번 더 받아온다.
+        연 뒤에는 지워지거나 교체돼도 fd 로 열어 둔 내용을 끝까지 읽을 수 있다.
+        """
+        for attempt in range(2):
+            entry = await self.get(key)
+            try:
+                f, size = await run_in_threadpool(_open_with_size, entry["path"])
+            except FileNotFoundError:
+                if attempt:
+                    raise
+                self._drop(entry)
+                continue
+            return entry, f, size
+
+    def _fetch_done(self, task: "asyncio.Task") -> None:
+        self._tasks.discard(task)
+        # 요청한 쪽이 모두 끊겼으면 아무도 결과를 읽지 않으므로 여기서 예외를 소비
+        if not task.cancelled():
+            task.exception()
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def _open_with_size(path: str) -> Tuple[BinaryIO, int]:
+    f = open(path, "rb")
+    return f, os.fstat(f.fileno()).st_size
+
+
+# Create a singleton instance
+image_cache = ImageDiskCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES, IMAGE_CACHE_REVALIDATE_SECONDS)
@@ -0,0 +1,183 @@
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.services import univ_frames_service as univ
+from app.services.r2_client import head_bucket, list_top_level_folders
+from app.services.database import database
+from app.services.repository import universities_repo
+
+# 종료 시 진행 중인 생성 작업을 기다리는 최대 시간(초)
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "60"))
+# 워밍업 시 프레임 목록을 미리 읽어둘 대학 수 상한
+WARMUP_MAX_UNIVERSITIES = int(os.getenv("WARMUP_MAX_UNIVERSITIES", "500"))
+# 워밍업 이후 /ready 가 의존성(DB SELECT 1, R2 HeadBucket)을 다시 확인하는 주기와 각 검사의 제한 시간(초)
+READY_CHECK_INTERVAL_SECONDS = float(os.getenv("READY_CHECK_INTERVAL_SECONDS", "5"))
+READY_CHECK_TIMEOUT_SECONDS = float(os.getenv("READY_CHECK_TIMEOUT_SECONDS", "2"))
+
+
+class ShuttingDown(RuntimeError):
+    """Raised when a new generation is requested while the worker is draining."""
+
+
+class Lifecycle:
+    """
+    워커 단위 상태: 캐시 워밍업 진행률 + 진행 중인 생성 작업(drain) 추적.
+    /ready 는 이 상태를 보고 트래픽을 받을 준비가 됐는지 판단한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._inflight = 0
+        self.draining = False
+        self.warmup: Dict[str, Any] = {"state": "pending", "steps": {}, "started_at": None, "finished_at": None}
+        self._deps: Dict[str, Dict[str, Any]] = {}
+        self._deps_checked_at = 0.0
+        self._deps_lock: Optional[asyncio.Lock] = None
+        # 아직 끝나지 않은 R2 검사 (스레드풀 호출은 취소할 수 없으므로 겹쳐서 쌓이지 않게)
+        self._r2_probe: Optional["asyncio.Future"] = None
+
+    # ---------- warm-up ----------
+    def _warmup_steps(self) -> List[Tuple[str, Callable[[], Any], bool]]:
+        """(이름, 함수, 필수 여부). 필수 단계가 실패하면 not ready."""
+        return [
+            ("database", self._check_database, True),
+            ("university_index", univ._university_name_index, True),
+            ("frame_listings", self._warm_frame_listings, True),
+            # R2 가 설정된 경우에만 필수
+            ("r2_folders", lambda: list_top_level_folders(refresh=True), bool(os.getenv("R2_BUCKET"))),
+        ]
+
+    @staticmethod
+    def _check_database() -> int:
+        return database.run_sync(universities_repo.count())
+
+    @staticmethod
+    def _warm_frame_listings() -> int:
+        universities = univ.list_universities_with_frames()
+        for u in universities[:WARMUP_MAX_UNIVERSITIES]:
+            univ.get_frames_for_university_id(u["id"])
+        return len(universities)
+
+    def run_warmup(self) -> None:
+        self.warmup.update(state="running", started_at=time.time())
+        steps = self._warmup_steps()
+        for name, _, required in steps:
+            self.warmup["steps"][name] = {"state": "pending", "required": required}
+        for name, fn, required in steps:
+            step = self.warmup["steps"][name]
+            step["state"] = "running"
+            t0 = time.perf_counter()
+            try:
+                result = fn()
+                step.update(state="done", result=len(result) if isinstance(result, (list, dict)) else result)
+            except Exception as e:
+                step.update(state="failed", error=str(e))
+                print(f"Warm-up step '{name}' failed: {e}")
+            step["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        failed_required = [n for n, s in self.warmup["steps"].items() if s["required"] and s["state"] != "done"]
+        self.warmup.update(state="failed" if failed_required else "done", finished_at=time.time())
+
+    def start_warmup(self) -> None:
+        threading.Thread(target=self.run_warmup, name="warmup", daemon=True).start()
+
+    async def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        steps = self.warmup["steps"]
+        done = sum(1 for s in steps.values() if s["state"] in ("done", "failed"))
+        ready = self.warmup["state"] == "done" and not self.draining
+        body = {
+            "warmup": {
+                "state": self.warmup["state"],
+                "progress": f"{done}/{len(steps)}",
+                "steps": steps,
+            },
+            "inflight_generations": self._inflight,
+        }
+        if ready:
+            # 워밍업 이후에도 DB/R2 가 죽으면 not ready (결과는 READY_CHECK_INTERVAL_SECONDS 동안 재사용)
+            deps = await self.check_dependencies()
+            body["dependencies"] = deps
+            ready = all(d["ok"] for d in deps.values() if d["required"])
+        status = "ready" if ready else ("draining" if self.draining else "not_ready")
+        return ready, {"status": status, **body}
+
+    async def check_dependencies(self) -> Dict[str, Dict[str, Any]]:
+        if self._deps_lock is None:
+            self._deps_lock = asyncio.Lock()
+        async with self._deps_lock:
+            if self._deps and time.monotonic() - self._deps_checked_at < READY_CHECK_INTERVAL_SECONDS:
+                return self._deps
+            deps = {"database": await self._probe(lambda: database.run(database.ping()), required=True)}
+            if os.getenv("R2_BUCKET"):
+                deps["r2"] = await self._probe(self._probe_r2, required=True)
+            self._deps, self._deps_checked_at = deps, time.monotonic()
+            return deps
+
+    def _probe_r2(self) -> "asyncio.Future":
+        if self._r2_probe is None or self._r2_probe.done():
+            self._r2_probe = asyncio.ensure_future(run_in_threadpool(head_bucket))
+        return asyncio.shield(self._r2_probe)
+
+    @staticmethod
+    async def _probe(start: Callable[[], Any], required: bool) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(start(), READY_CHECK_TIMEOUT_SECONDS)
+            result = {"ok": True}
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": f"timed out after {READY_CHECK_TIMEOUT_SECONDS}s"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        result.update(required=required, elapsed_ms=round((time.perf_counter() - t0) * 1000, 1))
+        return result
+
+    # ---------- drain ----------
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @contextmanager
+    def track_generation(self):
+        """생성 요청 하나를 감싸서 종료 시 drain 대상이 되게 함. drain 중이면 ShuttingDown."""
+        with self._lock:
+            if self.draining:
+                raise ShuttingDown("Server is shutting down")
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight -= 1
+                self._cond.notify_all()
+
+    def begin_drain(self) -> None:
+        """새 생성 요청을 막고 /ready 를 draining 으로 전환 (즉시 반환)"""
+        with self._lock:
+            self.draining = True
+
+    def wait_idle(self, timeout: float = DRAIN_TIMEOUT_SECONDS) -> bool:
+        """진행 중인 생성이 끝날 때까지(최대 timeout초) 대기."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._inflight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"Drain timed out with {self._inflight} generation(s) still running")
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def drain(self, timeout: float = DRAIN_TIMEOUT_SECONDS) -> bool:
+        """새 생성 요청을 막고, 진행 중인 생성이 끝날 때까지(최대 timeout초) 대기."""
+        self.begin_drain()
+        return self.wait_idle(timeout)
+
+
+# Create a singleton instance
+lifecycle = Lifecycle()
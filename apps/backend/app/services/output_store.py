@@ -0,0 +1,53 @@
+import os
+from typing import Any, Dict, Optional
+
+from app.services.gemini_frame_service import GeneratedImage
+from app.services.r2_client import (get_object_bytes, presigned_url_for_key, public_url_for_key, r2_available,
+                                     upload_fileobj)
+
+# 생성 결과는 내용 해시로 키를 만들어 버킷에 저장 ('_' 로 시작 → 대학 폴더 동기화 대상 아님)
+GENERATED_PREFIX = os.getenv("GENERATED_PREFIX", "_generated").strip("/")
+GENERATED_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# public: R2_PUBLIC_DOMAIN URL, presigned: 만료되는 서명 URL (비공개 버킷용)
+GENERATED_URL_MODE = os.getenv("GENERATED_URL_MODE", "public")
+GENERATED_URL_EXPIRES = int(os.getenv("GENERATED_URL_EXPIRES", "86400"))
+# true 면 버킷 업로드와 별개로 워커 로컬 outputs/ 에도 저장
+GEMINI_KEEP_LOCAL_OUTPUT = os.getenv("GEMINI_KEEP_LOCAL_OUTPUT", "false").lower() in ("1", "true", "yes")
+
+
+def generated_key(image: GeneratedImage) -> str:
+    return f"{GENERATED_PREFIX}/{image.sha256[:2]}/{image.sha256}.{image.ext}"
+
+
+def bucket_available() -> bool:
+    return r2_available()
+
+
+def url_for_generated(key: str) -> str:
+    if GENERATED_URL_MODE == "presigned":
+        return presigned_url_for_key(key, expires_in=GENERATED_URL_EXPIRES)
+    return public_url_for_key(key)
+
+
+def store_generated(image: GeneratedImage) -> Dict[str, Any]:
+    """메모리 버퍼에서 바로 버킷으로 업로드 (같은 내용이면 같은 키라 재시도해도 안전)"""
+    key = generated_key(image)
+    upload_fileobj(key, image.open(), image.mime_type, cache_control=GENERATED_CACHE_CONTROL)
+    return {"image_key": key, "image_url": url_for_generated(key)}
+
+
+def load_generated(fields: Dict[str, Any]) -> Optional[GeneratedImage]:
+    """이전 응답 필드(result_path / image_key)로 생성 결과를 다시 읽음. 둘 다 없으면 None"""
+    data = None
+    path = fields.get("result_path")
+    if path and os.path.exists(path):
+        with open(path, "rb") as f:
+            data = f.read()
+    elif fields.get("image_key") and bucket_available():
+        try:
+            data = get_object_bytes(fields["image_key"])
+        except Exception as e:
+            print(f"[output_store] could not read {fields['image_key']}: {e}")
+    if data is None:
+        return None
+    return GeneratedImage(data, fields["mime_type"], fields["sha256"])
@@ -0,0 +1,335 @@
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+# dHash 해밍 거리가 이 값 이하이면 같은 사진 후보로 본다 (64비트 중). 재인코딩/1px 크롭은 보통 0~4
+GEMINI_DEDUPE_MAX_DISTANCE = int(os.getenv("GEMINI_DEDUPE_MAX_DISTANCE", "6"))
+# 후보 확인용 두 번째 신호: 16x16 dHash 거리(256비트 중), 4x4 평균 색 차이(0~255), 가로세로 비 차이(비율)
+GEMINI_DEDUPE_MAX_FINE_DISTANCE = int(os.getenv("GEMINI_DEDUPE_MAX_FINE_DISTANCE", "24"))
+GEMINI_DEDUPE_MAX_COLOR_DIFF = float(os.getenv("GEMINI_DEDUPE_MAX_COLOR_DIFF", "4"))
+GEMINI_DEDUPE_MAX_ASPECT_DIFF = float(os.getenv("GEMINI_DEDUPE_MAX_ASPECT_DIFF", "0.03"))
+# 단색/밋밋한 사진은 해시가 0 근처로 몰려 서로 다른 사진끼리 일치하므로 dedupe 하지 않는다 (9x8 흑백 썸네일 표준편차)
+GEMINI_DEDUPE_MIN_STDDEV = float(os.getenv("GEMINI_DEDUPE_MIN_STDDEV", "4"))
+# 기억하는 최근 생성 결과 수 (워커 단위, 넘으면 오래 안 쓴 것부터 버림)
+GEMINI_DEDUPE_MAX_ENTRIES = int(os.getenv("GEMINI_DEDUPE_MAX_ENTRIES", "4096"))
+GEMINI_DEDUPE_TTL_SECONDS = float(os.getenv("GEMINI_DEDUPE_TTL_SECONDS", "86400"))
+GEMINI_DEDUPE_ENABLED = os.getenv("GEMINI_DEDUPE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+HASH_SIZE = 8
+FINE_HASH_SIZE = 16
+COLOR_GRID = 4
+# 64비트 해시에 1 인 비트 / 행 안에서 비트가 바뀌는 횟수가 이보다 적으면 (그라데이션 등) 정보가 부족한 해시
+MIN_HASH_BITS = 8
+MIN_HASH_TRANSITIONS = 8
+
+
+class PhotoSignature:
+    """
+    업로드 사진의 지문. phash(64비트 dHash)로 후보를 찾고, 나머지(256비트 dHash, 가로세로 비, 4x4 평균 색)로 확인한다.
+    흑백 해시만으로는 색만 다른 사진(같은 구도의 다른 사람 사진 등)도 같다고 보기 때문.
+    """
+    __slots__ = ("phash", "fine", "aspect", "colors")
+
+    def __init__(self, phash: int, fine: int, aspect: float, colors: bytes):
+        self.phash = phash
+        self.fine = fine
+        self.aspect = aspect
+        self.colors = colors
+
+
+def _dhash_bits(gray, size: int) -> Tuple[int, int]:
+    """(size+1)x size 흑백 이미지 -> (dHash 비트, 행 안에서 비트가 바뀐 횟수)"""
+    px = list(gray.getdata())
+    bits = transitions = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        prev = None
+        for col in range(size):
+            bit = px[offset + col] > px[offset + col + 1]
+            bits = (bits << 1) | bit
+            if prev is not None and bit != prev:
+                transitions += 1
+            prev = bit
+    return bits, transitions
+
+
+def photo_signature(img) -> Optional[PhotoSignature]:
+    """
+    이미 열려 있는 PIL 이미지의 지문 (mime 판별과 같은 decode 를 재사용).
+    정보가 부족한 사진(단색, 그라데이션, 흐린 배경뿐인 사진)은 None: 이런 사진은 dedupe 하지 않는다.
+    """
+    from PIL import Image, ImageOps, ImageStat
+    # JPEG 은 DCT 단계에서 최대 1/8 로 줄여서 디코드 (큰 사진도 수 ms)
+    img.draft("RGB", (HASH_SIZE * 16, HASH_SIZE * 16))
+    # 브라우저가 EXIF 회전을 적용해서 다시 인코딩한 경우와 같은 지문이 나오도록
+    img = ImageOps.exif_transpose(img)
+    rgb = img.convert("RGB")
+    gray = rgb.convert("L")
+    small = gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    phash, transitions = _dhash_bits(small, HASH_SIZE)
+    set_bits = hamming(phash, 0)
+    if (min(set_bits, HASH_SIZE * HASH_SIZE - set_bits) < MIN_HASH_BITS or transitions < MIN_HASH_TRANSITIONS
+            or ImageStat.Stat(small).stddev[0] < GEMINI_DEDUPE_MIN_STDDEV):
+        return None
+    fine, _ = _dhash_bits(gray.resize((FINE_HASH_SIZE + 1, FINE_HASH_SIZE), Image.LANCZOS), FINE_HASH_SIZE)
+    colors = rgb.resize((COLOR_GRID, COLOR_GRID), Image.BOX).tobytes()
+    return PhotoSignature(phash, fine, rgb.width / rgb.height, colors)
+
+
+if hasattr(int, "bit_count"):  # Python 3.10+
+    def hamming(a: int, b: int) -> int:
+        return (a ^ b).bit_count()
+else:
+    def hamming(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+
+class _Entry:
+    __slots__ = ("key", "sig", "phash", "upload_sha256", "fields", "expires_at", "alive")
+
+    def __init__(self, key: Hashable, sig: PhotoSignature, upload_sha256: str, fields: Dict[str, Any],
+                 expires_at: float):
+        self.key = key
+        self.sig = sig
+        self.phash = sig.phash
+        self.upload_sha256 = upload_sha256
+        self.fields = fields
+        self.expires_at = expires_at
+        self.alive = True
+
+
+class BKTree:
+    """
+    해밍 거리용 BK-tree. 노드 = [entry, {거리: 자식 노드}].
+    삼각 부등식 덕분에 질의 거리 d 에서 |d - k| <= max_distance 인 자식만 내려가면 된다.
+    삭제는 표시만 하고(dead), 죽은 항목이 절반을 넘으면 살아 있는 항목으로 다시 만든다.
+    """
+
+    def __init__(self):
+        self.root: Optional[list] = None
+        self.size = 0
+        self.dead = 0
+
+    def add(self, entry: _Entry) -> None:
+        self.size += 1
+        if self.root is None:
+            self.root = [entry, {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(entry.phash, node[0].phash)
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [entry, {}]
+                return
+            node = child
+
+    def search(self, phash: int, max_distance: int) -> List[Tuple[int, _Entry]]:
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            entry, children = stack.pop()
+            d = hamming(phash, entry.phash)
+            if d <= max_distance and entry.alive:
+                found.append((d, entry))
+            for k, child in children.items():
+                if d - max_distance <= k <= d + max_distance:
+                    stack.append(child)
+        return found
+
+    def entries(self) -> List[_Entry]:
+        out, stack = [], [self.root] if self.root is not None else []
+        while stack:
+            entry, children = stack.pop()
+            out.append(entry)
+            stack.extend(children.values())
+        return out
+
+
+class DedupeHit:
+    def __init__(self, entry: _Entry, distance: int, exact: bool):
+        self.entry = entry
+        self.distance = distance
+        self.exact = exact
+
+    @property
+    def fields(self) -> Dict[str, Any]:
+        return self.entry.fields
+
+
+class PhotoDedupeIndex:
+    """
+    최근 생성 결과의 perceptual-hash 인덱스 (워커 단위, in-process).
+    (대학, 마스코트, 클라이언트) 마다 BK-tree 를 두고, 업로드 사진의 dHash 와 가까운 이전 결과를 찾는다.
+    바이트가 달라도(브라우저 재인코딩, 1px 크롭) 거리 max_distance 이내이고 두 번째 신호(PhotoSignature)도
+    일치하면 같은 요청으로 보고 결과를 재사용. 다른 사용자의 사진으로 만든 결과를 돌려주지 않도록 클라이언트별로 나눈다.
+    같은 사진의 생성이 진행 중이면 begin() 이 그 생성을 알려줘서 Gemini 를 두 번 부르지 않게 한다.
+    """
+
+    def __init__(self, max_distance: int = GEMINI_DEDUPE_MAX_DISTANCE, max_entries: int = GEMINI_DEDUPE_MAX_ENTRIES,
+                 ttl: float = GEMINI_DEDUPE_TTL_SECONDS, enabled: bool = GEMINI_DEDUPE_ENABLED,
+                 max_fine_distance: int = GEMINI_DEDUPE_MAX_FINE_DISTANCE,
+                 max_color_diff: float = GEMINI_DEDUPE_MAX_COLOR_DIFF,
+                 max_aspect_diff: float = GEMINI_DEDUPE_MAX_ASPECT_DIFF):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.max_fine_distance = max_fine_distance
+        self.max_color_diff = max_color_diff
+        self.max_aspect_diff = max_aspect_diff
+        self._lock = threading.Lock()
+        self._trees: Dict[Hashable, BKTree] = {}
+        # LRU: 가장 오래 안 쓴 항목이 앞
+        self._lru: "OrderedDict[int, _Entry]" = OrderedDict()
+        # 진행 중인 생성: key -> [(지문, 끝나면 완료되는 Future)]
+        self._pending: Dict[Hashable, List[Tuple[PhotoSignature, Future]]] = {}
+        self._latencies_ms: Deque[float] = deque(maxlen=1024)
+        self.stats = {"lookups": 0, "exact_hits": 0, "near_hits": 0, "misses": 0, "rejected": 0,
+                      "coalesced": 0, "inserts": 0, "evictions": 0}
+
+    @staticmethod
+    def key_for(university_name: str, university_mascot: str, scope: str) -> Tuple[str, str, str]:
+        """scope: 업로드한 클라이언트 (세션 id 또는 주소). 결과는 같은 scope 안에서만 재사용된다"""
+        return (" ".join(university_name.lower().split()), " ".join(university_mascot.lower().split()), scope)
+
+    def _confirms(self, a: PhotoSignature, b: PhotoSignature) -> bool:
+        if hamming(a.fine, b.fine) > self.max_fine_distance:
+            return False
+        if abs(a.aspect - b.aspect) > self.max_aspect_diff * max(a.aspect, b.aspect):
+            return False
+        return sum(abs(x - y) for x, y in zip(a.colors, b.colors)) <= self.max_color_diff * len(a.colors)
+
+    def lookup(self, key: Hashable, sig: PhotoSignature, upload_sha256: Optional[str] = None) -> Optional[DedupeHit]:
+        """가장 가까운 살아 있는 결과 (같은 거리면 업로드 바이트가 같은 것, 그다음 최근 것)"""
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        with self._lock:
+            self.stats["lookups"] += 1
+            tree = self._trees.get(key)
+            best: Optional[Tuple[Tuple[int, bool, float], _Entry]] = None
+            if tree is not None:
+                now = time.monotonic()
+                for d, entry in tree.search(sig.phash, self.max_distance):
+                    if entry.expires_at <= now:
+                        self._remove(entry)
+                        continue
+                    exact = entry.upload_sha256 == upload_sha256
+                    if not exact and not self._confirms(sig, entry.sig):
+                        self.stats["rejected"] += 1
+                        continue
+                    rank = (d, not exact, -entry.expires_at)
+                    if best is None or rank < best[0]:
+                        best = (rank, entry)
+            if best is None:
+                self.stats["misses"] += 1
+                hit = None
+            else:
+                (d, not_exact, _), entry = best
+                exact = not not_exact
+                self.stats["exact_hits" if exact else "near_hits"] += 1
+                self._lru.move_to_end(id(entry))
+                hit = DedupeHit(entry, d, exact)
+            self._latencies_ms.append((time.perf_counter() - started) * 1000)
+        return hit
+
+    def begin(self, key: Hashable, sig: PhotoSignature) -> Tuple[Future, bool]:
+        """
+        같은 사진의 생성이 진행 중이면 (그 Future, False): 끝날 때까지 기다린 뒤 lookup 하면 된다.
+        아니면 이 생성을 등록하고 (Future, True): 호출한 쪽은 결과를 add 한 뒤(실패해도) 반드시 finish 를 부른다.
+        """
+        with self._lock:
+            for other, future in self._pending.get(key, ()):
+                if hamming(sig.phash, other.phash) <= self.max_distance and self._confirms(sig, other):
+                    self.stats["coalesced"] += 1
+                    return future, False
+            future = Future()
+            if self.enabled:
+                self._pending.setdefault(key, []).append((sig, future))
+            return future, True
+
+    def finish(self, key: Hashable, future: Future) -> None:
+        """begin 으로 등록한 생성을 끝냄 (기다리던 요청들이 깨어나서 lookup 한다)"""
+        with self._lock:
+            pending = [p for p in self._pending.get(key, ()) if p[1] is not future]
+            if pending:
+                self._pending[key] = pending
+            else:
+                self._pending.pop(key, None)
+        if not future.done():
+            future.set_result(None)
+
+    def add(self, key: Hashable, sig: PhotoSignature, upload_sha256: str, fields: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        entry = _Entry(key, sig, upload_sha256, dict(fields), time.monotonic() + self.ttl)
+        with self._lock:
+            self._trees.setdefault(key, BKTree()).add(entry)
+            self._lru[id(entry)] = entry
+            self.stats["inserts"] += 1
+            while len(self._lru) > self.max_entries:
+                _, old = self._lru.popitem(last=False)
+                self._remove(old)
+                self.stats["evictions"] += 1
+
+    def discard(self, hit: DedupeHit) -> None:
+        """재사용할 수 없는 결과(예: 버킷/로컬 파일이 사라짐)를 인덱스에서 뺌"""
+        with self._lock:
+            self._remove(hit.entry)
+
+    def _remove(self, entry: _Entry) -> None:
+        if not entry.alive:
+            return
+        entry.alive = False
+        self._lru.pop(id(entry), None)
+        tree = self._trees.get(entry.key)
+        if tree is None:
+            return
+        tree.dead += 1
+        if tree.dead * 2 > tree.size:
+            alive = [e for e in tree.entries() if e.alive]
+            if not alive:
+                del self._trees[entry.key]
+                return
+            rebuilt = BKTree()
+            for e in alive:
+                rebuilt.add(e)
+            self._trees[entry.key] = rebuilt
+
+    def clear(self) -> None:
+        with self._lock:
+            self._trees.clear()
+            self._lru.clear()
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.stats["exact_hits"] + self.stats["near_hits"]
+            lookups = self.stats["lookups"]
+            latencies = sorted(self._latencies_ms)
+
+            def pct(p: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4)
+
+            return {
+                "enabled": self.enabled,
+                **self.stats,
+                "dedupe_rate": round(hits / lookups, 4) if lookups else None,
+                "entries": len(self._lru),
+                "keys": len(self._trees),
+                "in_flight": sum(len(p) for p in self._pending.values()),
+                "max_distance": self.max_distance,
+                "max_fine_distance": self.max_fine_distance,
+                "max_color_diff": self.max_color_diff,
+                "lookup_ms": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99), "max": pct(1.0)},
+                "ttl_seconds": self.ttl,
+            }
+
+
+# Create a singleton instance
+photo_dedupe = PhotoDedupeIndex()
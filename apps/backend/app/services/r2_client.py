@@ -1,7 +1,7 @@
 import os
-from typing import List, Optional, Iterator
-import boto3
-from botocore.client import Config
+import time
+from typing import BinaryIO, List, Optional, Iterator, Dict, Any
+from functools import lru_cache
 from urllib.parse import quote
 
 R2_ACCOUNT_ID = os.getenv("R2_ACCOUNT_ID")
@@ -11,6 +11,9 @@ R2_BUCKET = os.getenv("R2_BUCKET")
 R2_PUBLIC_DOMAIN = os.getenv("R2_PUBLIC_DOMAIN")
 
 def _client():
+    # boto3/botocore are slow to import; only pay for it when R2 is actually used
+    import boto3
+    from botocore.client import Config
     if not all([R2_ACCOUNT_ID, R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY, R2_BUCKET, R2_PUBLIC_DOMAIN]):
         missing = [k for k in ["R2_ACCOUNT_ID","R2_ACCESS_KEY_ID","R2_SECRET_ACCESS_KEY","R2_BUCKET","R2_PUBLIC_DOMAIN"]
                    if not os.getenv(k)]
@@ -48,32 +51,45 @@ def public_url_for_key(key: str) -> str:
 
 R2_ENDPOINT = f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com"
 
-s3 = boto3.client(
-    "s3",
-    region_name='auto',
-    endpoint_url=R2_ENDPOINT,
-    aws_access_key_id=R2_ACCESS_KEY_ID,
-    aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-)
+@lru_cache(maxsize=None)
+def get_s3():
+    """Shared S3 client for R2, created on first use (RuntimeError if R2 env vars are missing)."""
+    return _client()
 
 ## add
-def list_top_level_folders(bucket: Optional[str] = None) -> List[str]:
+# 최상위 폴더 목록은 자주 바뀌지 않으므로 TTL 동안 메모리에 캐시
+R2_FOLDER_CACHE_SECONDS = int(os.getenv("R2_FOLDER_CACHE_SECONDS", "300"))
+_folder_cache: Dict[str, Any] = {}
+
+def is_reserved_folder(name: str) -> bool:
+    """'_catalog' 처럼 '_' 로 시작하는 폴더는 대학 폴더가 아니라 시스템용"""
+    return name.startswith("_")
+
+def list_top_level_folders(bucket: Optional[str] = None, refresh: bool = False) -> List[str]:
     bucket = bucket or R2_BUCKET
-    paginator = s3.get_paginator("list_objects_v2")
+    cached = _folder_cache.get(bucket)
+    if cached and not refresh and time.monotonic() - cached[0] < R2_FOLDER_CACHE_SECONDS:
+        return list(cached[1])
+
+    paginator = get_s3().get_paginator("list_objects_v2")
 
     folders: List[str] = []
     for page in paginator.paginate(Bucket=bucket, Delimiter="/"):
         for cp in page.get("CommonPrefixes", []):
             prefix = cp.get("Prefix", "")
-            if prefix:
+            if prefix and not is_reserved_folder(prefix):
                 folders.append(prefix.rstrip("/"))
     folders = sorted(set(folders), key=lambda x: x.lower())
-    return folders
+    _folder_cache[bucket] = (time.monotonic(), folders)
+    return list(folders)
+
+def invalidate_folder_cache() -> None:
+    _folder_cache.clear()
 
 
 def list_keys(prefix: str, bucket: Optional[str] = None) -> Iterator[str]:
     bucket = bucket or R2_BUCKET
-    paginator = s3.get_paginator("list_objects_v2")
+    paginator = get_s3().get_paginator("list_objects_v2")
     for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
         for obj in page.get("Contents", []) or []:
             yield obj["Key"]
@@ -81,12 +97,90 @@ def list_keys(prefix: str, bucket: Optional[str] = None) -> Iterator[str]:
 def key_exists(key: str, bucket: Optional[str] = None) -> bool:
     bucket = bucket or R2_BUCKET
     try:
-        s3.head_object(Bucket=bucket, Key=key)
+        get_s3().head_object(Bucket=bucket, Key=key)
         return True
     except Exception:
         return False
 
+def head_bucket(bucket: Optional[str] = None) -> None:
+    """버킷에 접근 가능한지 확인 (/ready 의 의존성 검사용). 실패하면 예외."""
+    get_s3().head_bucket(Bucket=bucket or R2_BUCKET)
+
+def r2_available() -> bool:
+    """R2 환경 변수가 모두 설정돼서 클라이언트를 만들 수 있는지"""
+    try:
+        get_s3()
+        return True
+    except RuntimeError:
+        return False
+
 def public_url_for_key(key: str) -> str:
+    if not R2_PUBLIC_DOMAIN:
+        raise RuntimeError("R2_PUBLIC_DOMAIN is not set")
     base = R2_PUBLIC_DOMAIN.rstrip("/")
     k = quote(key.lstrip("/"))
-    return f"{base}/{k}"
\ No newline at end of file
+    return f"{base}/{k}"
+
+def list_objects(prefix: str = "", bucket: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Like list_keys, but also yields each object's ETag and size."""
+    bucket = bucket or R2_BUCKET
+    paginator = get_s3().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []) or []:
+            yield {"key": obj["Key"], "etag": obj.get("ETag", "").strip('"'), "size": obj.get("Size", 0)}
+
+def get_object_bytes(key: str, bucket: Optional[str] = None) -> bytes:
+    bucket = bucket or R2_BUCKET
+    resp = get_s3().get_object(Bucket=bucket, Key=key)
+    return resp["Body"].read()
+
+def put_object_bytes(key: str, data: bytes, content_type: str,
+                     bucket: Optional[str] = None, cache_control: Optional[str] = None,
+                     content_encoding: Optional[str] = None) -> None:
+    bucket = bucket or R2_BUCKET
+    kw = {"Bucket": bucket, "Key": key, "Body": data, "ContentType": content_type}
+    if cache_control:
+        kw["CacheControl"] = cache_control
+    if content_encoding:
+        kw["ContentEncoding"] = content_encoding
+    get_s3().put_object(**kw)
+
+# 이보다 큰 객체는 멀티파트로 나눠 병렬 업로드
+R2_MULTIPART_THRESHOLD = int(os.getenv("R2_MULTIPART_THRESHOLD_MB", "8")) * 1024 * 1024
+
+def upload_fileobj(key: str, fileobj: BinaryIO, content_type: str, bucket: Optional[str] = None,
+                   cache_control: Optional[str] = None) -> None:
+    """파일 객체를 스트리밍 업로드. R2_MULTIPART_THRESHOLD 이상이면 멀티파트 업로드."""
+    from boto3.s3.transfer import TransferConfig
+    bucket = bucket or R2_BUCKET
+    extra = {"ContentType": content_type}
+    if cache_control:
+        extra["CacheControl"] = cache_control
+    config = TransferConfig(multipart_threshold=R2_MULTIPART_THRESHOLD,
+                            multipart_chunksize=R2_MULTIPART_THRESHOLD, max_concurrency=4)
+    get_s3().upload_fileobj(fileobj, bucket, key, ExtraArgs=extra, Config=config)
+
+def presigned_url_for_key(key: str, expires_in: int = 3600, bucket: Optional[str] = None) -> str:
+    bucket = bucket or R2_BUCKET
+    return get_s3().generate_presigned_url("get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires_in)
+
+def get_object_if_changed(key: str, etag: Optional[str] = None, bucket: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    ETag 조건부 GET. 객체가 바뀌지 않았으면 None(304), 바뀌었으면 get_object 응답을 반환.
+    객체가 없으면 KeyError.
+    """
+    bucket = bucket or R2_BUCKET
+    kw = {"Bucket": bucket, "Key": key}
+    if etag:
+        kw["IfNoneMatch"] = f'"{etag}"'
+    from botocore.exceptions import ClientError
+    try:
+        return get_s3().get_object(**kw)
+    except ClientError as e:
+        code = str(e.response.get("Error", {}).get("Code", ""))
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if etag and (status == 304 or code in ("304", "NotModified")):
+            return None
+        if status == 404 or code in ("404", "NoSuchKey"):
+            raise KeyError(key) from e
+        raise
@@ -0,0 +1,82 @@
+import os
+import time
+import threading
+from typing import Any, Dict, Optional
+
+# Gemini 호출 속도 상한 (프로세스 단위, 분당 요청 수). 0 이면 제한 없음
+GEMINI_RATE_LIMIT_RPM = float(os.getenv("GEMINI_RATE_LIMIT_RPM", "60"))
+# 요청 경로에서 토큰을 기다리는 최대 시간(초). 넘으면 429 로 응답
+GEMINI_RATE_LIMIT_MAX_WAIT = float(os.getenv("GEMINI_RATE_LIMIT_MAX_WAIT", "30"))
+
+
+class RateLimiter:
+    """
+    스레드 안전 토큰 버킷. API 요청(스레드풀)과 오프라인 배치 CLI 가 같은 인스턴스를 공유한다.
+    - rate_per_minute 속도로 토큰이 차고, 최대 burst 개까지 쌓임
+    - 업스트림이 429 를 주면 backoff() 로 모든 호출자를 잠시 멈춤
+    """
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self._lock = threading.Lock()
+        self.configure(rate_per_minute, burst)
+        self.stats = {"acquired": 0, "timeouts": 0, "waited_seconds": 0.0, "backoffs": 0}
+
+    def configure(self, rate_per_minute: float, burst: Optional[int] = None) -> None:
+        with self._lock:
+            self.rate = rate_per_minute / 60.0
+            self.burst = max(1, burst if burst is not None else int(max(1, rate_per_minute // 10)))
+            self._tokens = float(self.burst)
+            self._updated = time.monotonic()
+            self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """토큰 하나를 얻을 때까지 대기. timeout 안에 못 얻으면 False."""
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        while True:
+            with self._lock:
+                if self.rate <= 0:
+                    self.stats["acquired"] += 1
+                    return True
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.stats["acquired"] += 1
+                    self.stats["waited_seconds"] += now - started
+                    return True
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if deadline is not None and time.monotonic() + wait > deadline:
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def backoff(self, seconds: float) -> None:
+        """업스트림이 속도 제한을 알려오면 모든 호출자를 seconds 동안 멈춤"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            # 멈춘 동안에는 토큰이 쌓이지 않음 (재개 직후 burst 로 몰리지 않도록)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+            self.stats["backoffs"] += 1
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate_per_minute": round(self.rate * 60, 3),
+                "burst": self.burst,
+                "tokens": round(self._tokens, 3),
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+                **{k: round(v, 3) if isinstance(v, float) else v for k, v in self.stats.items()},
+            }
+
+
+# Create a singleton instance
+gemini_rate_limiter = RateLimiter(GEMINI_RATE_LIMIT_RPM)
@@ -0,0 +1,212 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+
+from app.models import Frame, FrameThumbnail, University
+from app.services.database import Database, database
+
+# SQLite / PostgreSQL 공통 SQL 만 사용. 대소문자 무시 비교는 lower()/ilike, upsert 는 방언별 insert.
+
+universities_t = University.__table__
+frames_t = Frame.__table__
+thumbnails_t = FrameThumbnail.__table__
+
+FRAME_COLUMNS = (frames_t.c.id, frames_t.c.university_id, frames_t.c.r2_url, frames_t.c.filename, frames_t.c.sort_order)
+
+
+def _upsert(db: Database, table, index_elements: List[str], values: List[Dict[str, Any]], update_columns: List[str]):
+    if db.dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(table).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={c: stmt.excluded[c] for c in update_columns},
+    )
+
+
+class UniversityRepository:
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def count(self) -> int:
+        async with self.db.engine.connect() as con:
+            return (await con.execute(select(func.count()).select_from(universities_t))).scalar_one()
+
+    async def list_all(self) -> List[Dict[str, Any]]:
+        async with self.db.engine.connect() as con:
+            rows = await con.execute(
+                select(universities_t.c.university_id, universities_t.c.name).order_by(universities_t.c.name))
+            return [{"id": r[0], "name": r[1]} for r in rows]
+
+    async def list_with_frames(self) -> List[Dict[str, Any]]:
+        stmt = (
+            select(universities_t.c.university_id, universities_t.c.name)
+            .where(universities_t.c.university_id.in_(select(frames_t.c.university_id)))
+            .order_by(universities_t.c.name, universities_t.c.university_id)
+        )
+        async with self.db.engine.connect() as con:
+            return [{"id": r[0], "name": r[1]} for r in await con.execute(stmt)]
+
+    async def id_name_pairs(self) -> List[Tuple[int, str]]:
+        async with self.db.engine.connect() as con:
+            rows = await con.execute(
+                select(universities_t.c.university_id, universities_t.c.name).order_by(universities_t.c.university_id))
+            return [(r[0], r[1]) for r in rows]
+
+    async def get_name(self, university_id: int) -> Optional[str]:
+        async with self.db.engine.connect() as con:
+            return (await con.execute(
+                select(universities_t.c.name).where(universities_t.c.university_id == university_id)
+            )).scalar_one_or_none()
+
+    async def find_id_exact(self, name: str) -> Optional[int]:
+        """대소문자 무시 완전 일치"""
+        async with self.db.engine.connect() as con:
+            return (await con.execute(
+                select(universities_t.c.university_id)
+                .where(func.lower(universities_t.c.name) == name.lower())
+                .order_by(universities_t.c.university_id).limit(1)
+            )).scalar_one_or_none()
+
+    async def find_id_containing(self, query: str) -> Optional[int]:
+        """이름에 query 가 포함된 대학 중 가장 짧은 이름"""
+        async with self.db.engine.connect() as con:
+            return (await con.execute(
+                select(universities_t.c.university_id)
+                .where(universities_t.c.name.ilike(f"%{query}%"))
+                .order_by(func.length(universities_t.c.name), universities_t.c.university_id).limit(1)
+            )).scalar_one_or_none()
+
+
+class FrameRepository:
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def list_all(self) -> List[Dict[str, Any]]:
+        async with self.db.engine.connect() as con:
+            result = await con.execute(select(*FRAME_COLUMNS).order_by(frames_t.c.id))
+            # Row._mapping 을 행마다 만드는 것보다 컬럼 이름을 한 번만 꺼내 zip 하는 쪽이 빠름
+            keys = tuple(result.keys())
+            return [dict(zip(keys, r)) for r in result]
+
+    async def get(self, frame_id: int) -> Optional[Dict[str, Any]]:
+        async with self.db.engine.connect() as con:
+            row = (await con.execute(select(*FRAME_COLUMNS).where(frames_t.c.id == frame_id))).first()
+            return dict(row._mapping) if row else None
+
+    async def create(self, values: Dict[str, Any]) -> int:
+        async with self.db.engine.begin() as con:
+            result = await con.execute(insert(frames_t).values(**values).returning(frames_t.c.id))
+            return result.scalar_one()
+
+    async def update(self, frame_id: int, values: Dict[str, Any]) -> Tuple[bool, Optional[int]]:
+        """(변경 여부, 변경 전 university_id)"""
+        async with self.db.engine.begin() as con:
+            old = (await con.execute(
+                select(frames_t.c.university_id).where(frames_t.c.id == frame_id))).scalar_one_or_none()
+            result = await con.execute(update(frames_t).where(frames_t.c.id == frame_id).values(**values))
+            return result.rowcount > 0, old
+
+    async def delete(self, frame_id: int) -> Tuple[bool, Optional[int]]:
+        """(삭제 여부, 삭제된 프레임의 university_id)"""
+        async with self.db.engine.begin() as con:
+            old = (await con.execute(
+                select(frames_t.c.university_id).where(frames_t.c.id == frame_id))).scalar_one_or_none()
+            result = await con.execute(delete(frames_t).where(frames_t.c.id == frame_id))
+            return result.rowcount > 0, old
+
+    async def upsert(self, university_id: int, filename: str, url: str, sort_order: int) -> None:
+        stmt = _upsert(self.db, frames_t, ["university_id", "filename"],
+                       [{"university_id": university_id, "filename": filename, "r2_url": url, "sort_order": sort_order}],
+                       ["r2_url", "sort_order"])
+        async with self.db.engine.begin() as con:
+            await con.execute(stmt)
+
+    async def for_university(self, university_id: int) -> List[Dict[str, Any]]:
+        """대학의 프레임 목록 + 각 프레임의 srcset (한 커넥션에서 두 쿼리)"""
+        async with self.db.engine.connect() as con:
+            rows = await con.execute(
+                select(frames_t.c.id, frames_t.c.filename, frames_t.c.r2_url, frames_t.c.sort_order)
+                .where(frames_t.c.university_id == university_id)
+                .order_by(frames_t.c.sort_order, frames_t.c.filename)
+            )
+            frames = [dict(r._mapping) for r in rows]
+            srcsets = await _srcsets(con, [f["r2_url"] for f in frames])
+        for f in frames:
+            f["srcset"] = srcsets.get(f["r2_url"], {})
+        return frames
+
+    async def catalog_rows(self) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+        """(프레임이 있는 대학, 전체 프레임, 전체 썸네일) — 카탈로그 매니페스트용, 한 트랜잭션에서 읽음"""
+        async with self.db.engine.begin() as con:
+            universities = await con.execute(
+                select(universities_t.c.university_id, universities_t.c.name)
+                .where(universities_t.c.university_id.in_(select(frames_t.c.university_id)))
+                .order_by(universities_t.c.name, universities_t.c.university_id)
+            )
+            universities = [tuple(r) for r in universities]
+            frames = await con.execute(
+                select(*FRAME_COLUMNS).order_by(
+                    frames_t.c.university_id, frames_t.c.sort_order, frames_t.c.filename, frames_t.c.id))
+            frames = [tuple(r) for r in frames]
+            thumbs = await con.execute(
+                select(thumbnails_t.c.source_url, thumbnails_t.c.width, thumbnails_t.c.r2_url)
+                .order_by(thumbnails_t.c.source_url, thumbnails_t.c.width))
+            return universities, frames, [tuple(r) for r in thumbs]
+
+
+async def _srcsets(con, urls: List[str]) -> Dict[str, Dict[str, str]]:
+    if not urls:
+        return {}
+    rows = await con.execute(
+        select(thumbnails_t.c.source_url, thumbnails_t.c.width, thumbnails_t.c.r2_url)
+        .where(thumbnails_t.c.source_url.in_(urls))
+        .order_by(thumbnails_t.c.width)
+    )
+    out: Dict[str, Dict[str, str]] = {}
+    for source_url, width, r2_url in rows:
+        out.setdefault(source_url, {})[f"{width}w"] = r2_url
+    return out
+
+
+class ThumbnailRepository:
+    def __init__(self, db: Database):
+        self.db = db
+        self._ready = False
+
+    async def ensure_table(self) -> None:
+        """frame_thumbnails 는 나중에 추가된 테이블이라 기존 DB 에 없을 수 있음"""
+        if not self._ready:
+            async with self.db.engine.begin() as con:
+                await con.run_sync(thumbnails_t.create, checkfirst=True)
+            self._ready = True
+
+    async def srcsets_for_urls(self, urls: List[str]) -> Dict[str, Dict[str, str]]:
+        async with self.db.engine.connect() as con:
+            return await _srcsets(con, list(urls))
+
+    async def source_etags(self) -> Dict[str, Dict[int, str]]:
+        """source_key -> {width: 생성 당시 원본 ETag}"""
+        async with self.db.engine.connect() as con:
+            rows = await con.execute(
+                select(thumbnails_t.c.source_key, thumbnails_t.c.width, thumbnails_t.c.source_etag))
+            done: Dict[str, Dict[int, str]] = {}
+            for key, width, etag in rows:
+                done.setdefault(key, {})[width] = etag
+            return done
+
+    async def upsert_many(self, rows: Iterable[Dict[str, Any]]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        stmt = _upsert(self.db, thumbnails_t, ["source_key", "width"], rows,
+                       ["source_url", "source_etag", "r2_key", "r2_url"])
+        async with self.db.engine.begin() as con:
+            await con.execute(stmt)
+
+
+universities_repo = UniversityRepository(database)
+frames_repo = FrameRepository(database)
+thumbnails_repo = ThumbnailRepository(database)
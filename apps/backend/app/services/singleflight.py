@@ -0,0 +1,36 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    같은 키에 대한 동시 호출을 하나로 합친다 (스레드 기반).
+    먼저 들어온 호출만 fn 을 실행하고, 그 사이에 들어온 호출은 같은 결과(또는 예외)를 받는다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """(결과, 다른 호출의 결과를 공유했는지) 반환."""
+        with self._lock:
+            fut = self._calls.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._calls[key] = Future()
+        if not owner:
+            return fut.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -0,0 +1,114 @@
+import os
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+
+from app.services.r2_client import list_objects, get_object_bytes, put_object_bytes, public_url_for_key, is_reserved_folder
+from app.services.univ_frames_service import IMG_EXTS
+from app.services.database import database
+from app.services.repository import thumbnails_repo
+from app.services.catalog_cache import catalog_cache
+
+# 생성할 썸네일 가로 폭(px). 예: THUMB_WIDTHS=128,256,512
+THUMB_WIDTHS: Tuple[int, ...] = tuple(sorted({int(w) for w in os.getenv("THUMB_WIDTHS", "128,256,512").split(",") if w.strip()}))
+THUMB_QUALITY = int(os.getenv("THUMB_QUALITY", "80"))
+THUMB_DIR = "thumbs"
+THUMB_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def thumbnail_key(source_key: str, width: int) -> str:
+    """'<folder>/1.png' -> '<folder>/thumbs/1-256w.webp'"""
+    folder, _, fname = source_key.rpartition("/")
+    stem = fname.rsplit(".", 1)[0]
+    prefix = f"{folder}/" if folder else ""
+    return f"{prefix}{THUMB_DIR}/{stem}-{width}w.webp"
+
+
+def is_thumbnail_key(key: str) -> bool:
+    return f"/{THUMB_DIR}/" in f"/{key}"
+
+
+def render_thumbnails(data: bytes, widths: Tuple[int, ...], quality: int) -> Dict[int, bytes]:
+    """원본 이미지 바이트를 각 폭의 WebP로 리사이즈. (프로세스 풀에서 실행됨)"""
+    out: Dict[int, bytes] = {}
+    with Image.open(BytesIO(data)) as img:
+        img.load()
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if img.mode in ("LA", "P", "PA") else "RGB")
+        src_w, src_h = img.size
+        for w in widths:
+            # 원본보다 크게 늘리지는 않음 (키는 동일하게 유지)
+            tw = min(w, src_w)
+            th = max(1, round(src_h * tw / src_w))
+            resized = img if tw == src_w else img.resize((tw, th), Image.LANCZOS)
+            buf = BytesIO()
+            resized.save(buf, format="WEBP", quality=quality, method=4)
+            out[w] = buf.getvalue()
+    return out
+
+
+def _stale_sources(prefix: str, widths: Tuple[int, ...]) -> List[Dict[str, str]]:
+    """썸네일이 없거나 원본 ETag가 바뀐 원본만 골라냄."""
+    database.run_sync(thumbnails_repo.ensure_table())
+    done = database.run_sync(thumbnails_repo.source_etags())
+
+    stale = []
+    for obj in list_objects(prefix):
+        key = obj["key"]
+        if key.endswith("/") or is_thumbnail_key(key) or not key.lower().endswith(IMG_EXTS):
+            continue
+        # _generated/ (사용자 생성 결과, 벌크 결과), _catalog/ 등 시스템 폴더는 프레임 원본이 아님
+        folder, sep, _ = key.partition("/")
+        if sep and is_reserved_folder(folder):
+            continue
+        have = done.get(key, {})
+        if all(have.get(w) == obj["etag"] for w in widths):
+            continue
+        stale.append(obj)
+    return stale
+
+
+def _process_one(obj: Dict[str, str], pool: ProcessPoolExecutor, widths: Tuple[int, ...], quality: int) -> List[dict]:
+    key = obj["key"]
+    data = get_object_bytes(key)
+    rendered = pool.submit(render_thumbnails, data, widths, quality).result()
+    source_url = public_url_for_key(key)
+    records = []
+    for w, body in rendered.items():
+        tkey = thumbnail_key(key, w)
+        put_object_bytes(tkey, body, "image/webp", cache_control=THUMB_CACHE_CONTROL)
+        records.append({"source_key": key, "source_url": source_url, "source_etag": obj["etag"],
+                        "width": w, "r2_key": tkey, "r2_url": public_url_for_key(tkey)})
+    return records
+
+
+def generate_thumbnails(prefix: str = "", widths: Optional[Tuple[int, ...]] = None,
+                        processes: Optional[int] = None, io_workers: int = 8) -> Dict[str, int]:
+    """
+    버킷의 원본 프레임 이미지에 대해 WebP 썸네일을 증분 생성.
+    - 리사이즈/인코딩은 CPU 코어 수만큼의 프로세스 풀에서 병렬 처리
+    - 다운로드/업로드는 스레드 풀에서 처리
+    - 결과는 frame_thumbnails 테이블에 기록
+    """
+    widths = widths or THUMB_WIDTHS
+    stale = _stale_sources(prefix, widths)
+    stats = {"sources": len(stale), "thumbnails": 0, "failed": 0}
+    if not stale:
+        return stats
+
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool, \
+            ThreadPoolExecutor(max_workers=io_workers) as io_pool:
+        futures = {io_pool.submit(_process_one, obj, pool, widths, THUMB_QUALITY): obj["key"] for obj in stale}
+        for fut in as_completed(futures):
+            try:
+                records = fut.result()
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"Thumbnail generation failed for {futures[fut]}: {e}")
+                continue
+            database.run_sync(thumbnails_repo.upsert_many(records))
+            stats["thumbnails"] += len(records)
+    # Frame listings embed the srcset map
+    catalog_cache.clear()
+    return stats
@@ -1,11 +1,12 @@
-import os, re, sqlite3
-from typing import List, Dict, Any, Optional, Set
-from app.services.r2_client import list_keys, public_url_for_key, list_top_level_folders, s3, R2_BUCKET, key_exists
-
-
-DEFAULT_DB = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../yujin/univ.db"))
-UNIV_DB_PATH = os.getenv("UNIV_DB_PATH", DEFAULT_DB)
-print(UNIV_DB_PATH)
+import os, re, time
+from typing import List, Dict, Any, Optional, Set, Tuple
+from app.services.r2_client import list_keys, public_url_for_key, list_top_level_folders, get_s3, R2_BUCKET, key_exists, invalidate_folder_cache
+from app.services.singleflight import SingleFlight
+from app.services.catalog_cache import catalog_cache
+from app.services.database import database
+from app.services.repository import universities_repo, frames_repo, thumbnails_repo
+
+# DB 접근은 repository 계층(DATABASE_URL, 기본은 UNIV_DB_PATH 의 SQLite)을 거침
 IMG_EXTS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
 
 _norm_keep = re.compile(r"[a-z0-9\s-]", re.IGNORECASE)
@@ -16,66 +17,70 @@ def normalize_name(s: str) -> str:
     s = re.sub(r"-{2,}", "-", s).strip("-")
     return s
 
-def db():
-    con = sqlite3.connect(UNIV_DB_PATH)
-    con.row_factory = sqlite3.Row
-    con.execute("PRAGMA foreign_keys=ON;")
-    return con
-
 def list_all_universities():
-    conn = sqlite3.connect(UNIV_DB_PATH)
-    cur = conn.cursor()
-    cur.execute("SELECT university_id, name FROM Universities ORDER BY name")
-    rows = cur.fetchall()
-    conn.close()
-    return [{"id": r[0], "name": r[1]} for r in rows]
+    return database.run_sync(universities_repo.list_all())
 
 def list_universities_with_frames():
-    with db() as con:  # 이미 row_factory=sqlite3.Row 로 세팅됨
-        rows = con.execute("""
-            SELECT DISTINCT u.university_id, u.name
-            FROM Universities u
-            JOIN frames f ON u.university_id = f.university_id
-            ORDER BY u.name
-        """).fetchall()
-        return [{"id": r["university_id"], "name": r["name"]} for r in rows]
-
-
-def find_university_id_by_name(query: str) -> Optional[int]:
-    with db() as con:
-        cur = con.cursor()
-        row = cur.execute("SELECT university_id FROM Universities WHERE name = ? COLLATE NOCASE", (query,)).fetchone()
-        if row: return row["university_id"]
-        key = normalize_name(query)
-        rows = cur.execute("SELECT university_id, name FROM Universities").fetchall()
-        candidates = [r["university_id"] for r in rows if normalize_name(r["name"]) == key]
-        if len(candidates) >= 1: return candidates[0]
-        row = cur.execute("""
-            SELECT university_id FROM Universities
-            WHERE name LIKE ? COLLATE NOCASE
-            ORDER BY LENGTH(name) ASC LIMIT 1
-        """, (f"%{query}%",)).fetchone()
-        return row["university_id"] if row else None
+    return catalog_cache.universities(_load_universities_with_frames)[0]
+
+def universities_with_frames_body() -> bytes:
+    """list_universities_with_frames 의 직렬화된 JSON 본문 (캐시)"""
+    return catalog_cache.universities(_load_universities_with_frames)[1]
+
+def _load_universities_with_frames():
+    return database.run_sync(universities_repo.list_with_frames())
+
+
+# 정규화된 이름 -> university_id 인덱스 (Universities 테이블 전체 스캔을 요청마다 반복하지 않도록)
+_name_index: Optional[Dict[str, int]] = None
+
+def _university_name_index() -> Dict[str, int]:
+    global _name_index
+    if _name_index is None:
+        index: Dict[str, int] = {}
+        for uid, name in database.run_sync(universities_repo.id_name_pairs()):
+            index.setdefault(normalize_name(name), uid)
+        _name_index = index
+    return _name_index
+
+def invalidate_university_index() -> None:
+    global _name_index
+    _name_index = None
+
+def find_university_id_by_name(query: str, partial: bool = True) -> Optional[int]:
+    """
+    완전 일치(대소문자 무시) -> 정규화 이름 일치 -> (partial=True 일 때만) 부분 문자열 일치.
+    부분 일치는 "Michigan" -> "Michigan State University" 처럼 다른 대학을 고를 수 있으므로
+    사용자 검색에만 쓰고, 데이터를 쓰는 일괄 동기화에서는 끈다.
+    """
+    uid = database.run_sync(universities_repo.find_id_exact(query))
+    if uid is not None: return uid
+    uid = _university_name_index().get(normalize_name(query))
+    if uid is not None or not partial: return uid
+    return database.run_sync(universities_repo.find_id_containing(query))
 
 def get_frames_for_university_id(university_id: int) -> List[Dict[str, Any]]:
-    with db() as con:
-        rows = con.execute("""
-            SELECT id, filename, r2_url, sort_order
-            FROM frames
-            WHERE university_id = ?
-            ORDER BY sort_order, filename
-        """, (university_id,)).fetchall()
-        return [dict(r) for r in rows]
+    return catalog_cache.frames_for_university(university_id, _load_frames_for_university_id)[0]
+
+def get_frames_body_for_university_id(university_id: int) -> Tuple[int, bytes]:
+    """(프레임 수, 직렬화된 프레임 목록 JSON) — 캐시 hit 이면 SQL/인코딩 없음"""
+    frames, body = catalog_cache.frames_for_university(university_id, _load_frames_for_university_id)
+    return len(frames), body
+
+def _load_frames_for_university_id(university_id: int) -> List[Dict[str, Any]]:
+    database.run_sync(thumbnails_repo.ensure_table())
+    return database.run_sync(frames_repo.for_university(university_id))
+
+def get_srcsets_for_urls(urls: List[str]) -> Dict[str, Dict[str, str]]:
+    """원본 URL -> {"128w": 썸네일 URL, ...} (srcset 형태) 매핑."""
+    if not urls:
+        return {}
+    database.run_sync(thumbnails_repo.ensure_table())
+    return database.run_sync(thumbnails_repo.srcsets_for_urls(urls))
 
 def upsert_frame(university_id: int, filename: str, url: str, sort_order: int) -> None:
-    with db() as con:
-        con.execute("""
-            INSERT INTO frames (university_id, r2_url, filename, sort_order)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(university_id, filename)
-            DO UPDATE SET r2_url=excluded.r2_url, sort_order=excluded.sort_order
-        """, (university_id, url, filename, sort_order))
-        con.commit()
+    database.run_sync(frames_repo.upsert(university_id, filename, url, sort_order))
+    catalog_cache.invalidate_university(university_id)
 
 def parse_sort(filename: str) -> int:
     stem = filename.rsplit(".", 1)[0]
@@ -84,9 +89,7 @@ def parse_sort(filename: str) -> int:
     return int(m.group(1)) if m else 999
 
 def on_demand_sync_by_folder(university_name: str, university_id: int) -> int:
-    with db() as con:
-        row = con.execute("SELECT name FROM Universities WHERE university_id=?", (university_id,)).fetchone()
-        canonical = row["name"] if row else university_name
+    canonical = database.run_sync(universities_repo.get_name(university_id)) or university_name
 
     candidates = []
     for c in [university_name, canonical]:
@@ -116,6 +119,54 @@ def on_demand_sync_by_folder(university_name: str, university_id: int) -> int:
             break
     return inserted
 
+# R2 에 폴더/이미지가 없던 대학은 이 시간(초) 동안 다시 R2 를 조회하지 않음
+SYNC_NEGATIVE_TTL_SECONDS = int(os.getenv("SYNC_NEGATIVE_TTL_SECONDS", "600"))
+_sync_flight = SingleFlight()
+_no_frames_until: Dict[int, float] = {}
+
+def _sync_and_remember(university_name: str, university_id: int) -> int:
+    inserted = on_demand_sync_by_folder(university_name, university_id)
+    if inserted == 0:
+        _no_frames_until[university_id] = time.monotonic() + SYNC_NEGATIVE_TTL_SECONDS
+    else:
+        _no_frames_until.pop(university_id, None)
+    return inserted
+
+def sync_university_frames(university_name: str, university_id: int) -> int:
+    """
+    on_demand_sync_by_folder 를 감싼 버전.
+    - 같은 university_id 에 대한 동시 요청은 하나의 동기화를 기다림 (single-flight)
+    - "R2 에 프레임 없음" 결과는 TTL 동안 캐시 (negative cache, 버킷 동기화 시 무효화)
+    """
+    expires = _no_frames_until.get(university_id)
+    if expires is not None:
+        if expires > time.monotonic():
+            return 0
+        _no_frames_until.pop(university_id, None)
+    inserted, _ = _sync_flight.do(university_id, _sync_and_remember, university_name, university_id)
+    return inserted
+
+def invalidate_sync_negative_cache() -> None:
+    _no_frames_until.clear()
+
+def sync_bucket() -> Dict[str, Any]:
+    """
+    버킷의 모든 최상위 폴더를 DB frames 와 동기화하고, negative cache 를 비움.
+    폴더 이름이 대학 이름과 정확히(또는 정규화해서) 일치할 때만 연결하고, 나머지는 unmatched 로 보고.
+    """
+    invalidate_folder_cache()
+    folders = list_top_level_folders(R2_BUCKET, refresh=True)
+    matched, frames, unmatched = 0, 0, []
+    for folder in folders:
+        uid = find_university_id_by_name(folder, partial=False)
+        if uid is None:
+            unmatched.append(folder)
+            continue
+        matched += 1
+        frames += on_demand_sync_by_folder(folder, uid)
+    invalidate_sync_negative_cache()
+    return {"folders": len(folders), "matched": matched, "frames": frames, "unmatched": unmatched}
+
 
 
 def list_universities_with_frames_from_r2(strict_check: bool = False) -> List[str]:
@@ -126,7 +177,7 @@ def list_universities_with_frames_from_r2(strict_check: bool = False) -> List[st
 
     has_images: List[str] = []
     for name in folders:
-        resp = s3.list_objects_v2(Bucket=R2_BUCKET, Prefix=f"{name}/", MaxKeys=50)
+        resp = get_s3().list_objects_v2(Bucket=R2_BUCKET, Prefix=f"{name}/", MaxKeys=50)
         contents = resp.get("Contents", []) or []
         found = False
         for obj in contents:
@@ -0,0 +1,155 @@
+import os
+import hashlib
+import tempfile
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.datastructures import Headers, UploadFile
+
+# 업로드 최대 크기 (MB). 넘으면 413
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "15")) * 1024 * 1024)
+UPLOAD_CHUNK_SIZE = 256 * 1024
+# 파일 파트를 받는 spooled 버퍼: 이 크기까지는 메모리, 넘으면 임시 파일 (Starlette 와 같은 1 MB)
+SPOOL_MAX_SIZE = 1024 * 1024
+# 파일이 아닌 폼 필드(university_name, targets 등) 하나의 최대 크기
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class IngestedUpload:
+    """
+    수신하면서 크기/sha256 을 확인한 업로드와, 되감아 둔 spooled 버퍼 (1 MB 까지는 메모리, 넘으면 임시 파일).
+    이후 단계(디스크 저장, Pillow decode, base64 인코딩)는 각자 이 버퍼를 처음부터 다시 읽는다.
+    다 쓰면 close() (임시 파일 삭제).
+    """
+
+    def __init__(self, file: BinaryIO, size: int, sha256: str, filename: Optional[str], content_type: Optional[str]):
+        self.file = file
+        self.size = size
+        self.sha256 = sha256
+        self.filename = filename
+        self.content_type = content_type
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _StreamingForm:
+    """
+    python-multipart 콜백으로 multipart 본문을 받는 상태.
+    file_field 파일 파트의 데이터는 pending 에 모아 두고 receive_upload 가 청크마다 비운다
+    (UploadFile.write 가 async 라 콜백 안에서 쓰지 못함). 나머지 필드는 문자열로 모은다.
+    """
+
+    def __init__(self, file_field: str):
+        self.file_field = file_field
+        self.fields: Dict[str, str] = {}
+        self.upload: Optional[UploadFile] = None
+        self.pending: List[bytes] = []
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._headers: List[Tuple[bytes, bytes]] = []
+        self._name = ""
+        self._value = bytearray()
+        self._to_file = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers = []
+        self._value = bytearray()
+        self._to_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers.append((bytes(self._header_field).lower(), bytes(self._header_value)))
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def on_headers_finished(self) -> None:
+        headers = dict(self._headers)
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise HTTPException(status_code=400, detail="Missing name in multipart part")
+        self._name = options[b"name"].decode("utf-8", "replace")
+        if self._name == self.file_field and b"filename" in options:
+            if self.upload is not None:
+                raise HTTPException(status_code=422, detail=f"Only one '{self.file_field}' file may be uploaded")
+            self.upload = UploadFile(
+                tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE),
+                size=0,
+                filename=options[b"filename"].decode("utf-8", "replace"),
+                headers=Headers(raw=self._headers),
+            )
+            self._to_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._to_file:
+            self.pending.append(data[start:end])
+            return
+        self._value += data[start:end]
+        if len(self._value) > MAX_FIELD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Form field '{self._name}' is too large")
+
+    def on_part_end(self) -> None:
+        if not self._to_file:
+            self.fields[self._name] = self._value.decode("utf-8", "replace")
+
+
+async def receive_upload(request: Request, file_field: str = "image",
+                         max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[Dict[str, str], IngestedUpload]:
+    """
+    multipart 본문을 request.stream() 으로 받으면서 파싱해, file_field 파일 파트를 spooled 버퍼 하나에 쓰는 동시에
+    크기 제한 확인과 sha256 계산을 한다. 본문을 받는 동안 들고 있는 것은 수신 청크 하나와 spool 버퍼(최대 1 MB) 뿐.
+    반환: (나머지 폼 필드, IngestedUpload)
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=422, detail="Expected a multipart/form-data body")
+
+    form = _StreamingForm(file_field)
+    parser = MultipartParser(options[b"boundary"], form.callbacks())
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for data in form.pending:
+                size += len(data)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes // (1024 * 1024)} MB limit")
+                digest.update(data)
+                await form.upload.write(data)
+            form.pending.clear()
+        parser.finalize()
+    except MultipartParseError as e:
+        if form.upload is not None:
+            await form.upload.close()
+        raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+    except BaseException:
+        if form.upload is not None:
+            await form.upload.close()
+        raise
+
+    if form.upload is None:
+        raise HTTPException(status_code=422, detail=f"Field required: {file_field}")
+    if size == 0:
+        await form.upload.close()
+        raise HTTPException(status_code=422, detail="Uploaded image is empty")
+    await form.upload.seek(0)
+    return form.fields, IngestedUpload(form.upload.file, size, digest.hexdigest(), form.upload.filename,
+                                       form.upload.content_type)
@@ -0,0 +1,24 @@
+# Production server settings: gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+
+# One worker per core unless overridden
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# UvicornWorker that drains generations on SIGTERM before it stops accepting (app/server.py)
+worker_class = "app.server.DrainingUvicornWorker"
+
+# Import the app once in the master and fork workers from it (shared, copy-on-write modules).
+# Cache warm-up runs per worker in the startup event, after the fork.
+preload_app = True
+
+# Gemini generations can take a while; give in-flight requests time to finish on SIGTERM.
+# On SIGTERM each worker first drains generations (up to DRAIN_TIMEOUT_SECONDS, /ready reports "draining"),
+# then uvicorn stops accepting and finishes open connections. Keep this above DRAIN_TIMEOUT_SECONDS.
+timeout = int(os.getenv("WORKER_TIMEOUT", "180"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "90"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
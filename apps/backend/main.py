@@ -1,18 +1,24 @@
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load .env once, before any app module reads its settings from the environment
+load_dotenv(os.getenv("ENV_FILE") or str(Path(__file__).resolve().parent / ".env"))
+
 import uvicorn
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.routers import api_router
 from app.routers.db_router import dbrouter 
+from app.middleware import AdmissionControlMiddleware, CompressionMiddleware, UploadSizeLimitMiddleware, render_metrics
+from app.services.uploads import MAX_UPLOAD_BYTES
+from app.services.lifecycle import lifecycle
+from app.services.database import database
 
 
-# # 👇 add these lines at the very top of main.py
-# import os
-# from pathlib import Path
-# from dotenv import load_dotenv
-
-# ENV_FILE = os.getenv("ENV_FILE") or str(Path(__file__).resolve().parent / "db.env")
-# load_dotenv(ENV_FILE)
-
 
 # Create FastAPI app
 app = FastAPI(
@@ -21,6 +27,21 @@ app = FastAPI(
     version="0.1.0",
 )
 
+# Per-route-group concurrency limits with bounded queues; overflow gets 503 + Retry-After
+# (innermost, so oversized uploads are rejected without taking a slot)
+app.add_middleware(AdmissionControlMiddleware)
+
+# Reject oversized uploads before the multipart body is buffered
+# (added before CORS so CORS stays outermost and 413s/503s still carry CORS headers)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=MAX_UPLOAD_BYTES,
+    path_prefixes=["/api/v1/gemini-frames"],
+)
+
+# gzip/brotli for large JSON bodies (catalog lists); streaming responses pass through uncompressed
+app.add_middleware(CompressionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -35,15 +56,43 @@ app.add_middleware(
 async def root():
     return {"message": "Welcome to Frame Gen API"}
 
-# Health check endpoint
+# Health check endpoint (liveness: the process is up)
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+# Readiness endpoint: 503 until caches are warm and dependencies respond, and while draining
+@app.get("/ready")
+async def readiness_check():
+    ready, body = await lifecycle.readiness()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+# Admission-control metrics (Prometheus text format, per worker)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return render_metrics()
+
+@app.on_event("startup")
+async def warm_caches():
+    lifecycle.start_warmup()
+
+@app.on_event("shutdown")
+async def drain_generations():
+    # Under gunicorn (app.server.DrainingUvicornWorker) this already happened when SIGTERM arrived;
+    # plain `uvicorn main:app` only drains here, after open connections have finished
+    await run_in_threadpool(lifecycle.drain)
+    # 진행 중인 작업이 끝난 뒤 DB 커넥션 풀 정리
+    await run_in_threadpool(database.close)
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
 
 # Run the application
+#   python main.py          -> development server with auto-reload
+#   python main.py --prod   -> gunicorn + uvicorn workers (see gunicorn.conf.py)
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    if "--prod" in sys.argv[1:] or os.getenv("APP_ENV") == "production":
+        conf = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py")
+        os.execvp("gunicorn", ["gunicorn", "-c", conf, "main:app"])
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,84 @@
+"""
+InlineImageDecoder must give the same result however the response body is split into chunks.
+
+    cd apps/backend
+    python -m pytest tests
+"""
+import base64
+import io
+import json
+import os
+import random
+
+import pytest
+
+from app.services.gemini_stream import InlineImageDecoder
+
+SPLIT_CASES = 400
+
+
+def _inline_data_response(image: bytes, mime_type: str) -> bytes:
+    body = {
+        "candidates": [{
+            "content": {"role": "model", "parts": [
+                {"text": "Here is your frame \"framed\" \\ with éscapes"},
+                {"inlineData": {"mimeType": mime_type, "data": base64.b64encode(image).decode("ascii")}},
+            ]},
+            "finishReason": "STOP",
+        }],
+        "usageMetadata": {"promptTokenCount": 12, "totalTokenCount": 1300},
+    }
+    return json.dumps(body, indent=1).encode("utf-8")
+
+
+def _data_uri_response(image: bytes, mime_type: str) -> bytes:
+    # JSON encoders may escape "/" and wrap the base64; the decoder has to undo both
+    b64 = base64.b64encode(image).decode("ascii")
+    wrapped = "\n".join(b64[i:i + 76] for i in range(0, len(b64), 76))
+    text = json.dumps(f"data:{mime_type};base64,{wrapped}").replace("/", "\\/")
+    return ('{"candidates": [{"content": {"parts": [{"text": ' + text + '}]}}]}').encode("utf-8")
+
+
+def _random_chunks(body: bytes, rng: random.Random):
+    i = 0
+    while i < len(body):
+        n = rng.choice((1, 2, 3, 4, 5, 7, rng.randint(1, 64), rng.randint(1, 4096)))
+        yield body[i:i + n]
+        i += n
+
+
+def _decode(chunks):
+    sink = io.BytesIO()
+    decoder = InlineImageDecoder(sink)
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder, sink.getvalue()
+
+
+@pytest.mark.parametrize("shape", [_inline_data_response, _data_uri_response])
+def test_whole_body(shape):
+    image = os.urandom(3000)
+    decoder, decoded = _decode([shape(image, "image/png")])
+    assert decoder.found
+    assert decoder.mime_type == "image/png"
+    assert decoded == image
+
+
+@pytest.mark.parametrize("seed", range(SPLIT_CASES))
+def test_random_chunk_splits(seed):
+    rng = random.Random(seed)
+    image = rng.randbytes(rng.randint(1, 5000))
+    mime_type = rng.choice(("image/png", "image/jpeg", "image/webp"))
+    shape = _inline_data_response if seed % 2 else _data_uri_response
+    decoder, decoded = _decode(_random_chunks(shape(image, mime_type), rng))
+    assert decoder.found
+    assert decoder.mime_type == mime_type
+    assert decoded == image
+    assert decoder.bytes_written == len(image)
+
+
+def test_no_image():
+    body = json.dumps({"candidates": [{"content": {"parts": [{"text": "I can't do that"}]}}]}).encode("utf-8")
+    decoder, decoded = _decode(body[i:i + 3] for i in range(0, len(body), 3))
+    assert not decoder.found
+    assert decoded == b""
@@ -80,7 +80,8 @@ export default function FrameGenerator() {
       }
       
       const data = await response.json();
-      setGeneratedImageUrl(data.data.image_base64);
+      // The backend returns a bucket URL; image_base64 is only present without R2 (local development)
+      setGeneratedImageUrl(data.data.image_url ?? data.data.image_base64);
     } catch (err) {
       setError(`Failed to generate frame: ${err instanceof Error ? err.message : String(err)}`);
     } finally {
@@ -88,14 +89,26 @@ export default function FrameGenerator() {
     }
   };
 
-  const downloadImage = () => {
+  const downloadImage = async () => {
     if (generatedImageUrl) {
+      // Cross-origin URLs ignore the download attribute, so fetch them into a blob URL first
+      let href = generatedImageUrl;
+      let objectUrl: string | null = null;
+      if (!generatedImageUrl.startsWith('data:')) {
+        try {
+          const blob = await (await fetch(generatedImageUrl)).blob();
+          objectUrl = href = URL.createObjectURL(blob);
+        } catch {
+          // Fall back to opening the URL directly
+        }
+      }
       const link = document.createElement('a');
-      link.href = generatedImageUrl;
+      link.href = href;
       link.download = `${universityName.replace(/\s+/g, '-').toLowerCase()}-frame.png`;
       document.body.appendChild(link);
       link.click();
       document.body.removeChild(link);
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
     }
   };
 
@@ -0,0 +1,411 @@
+"""
+Offline bulk frame generation.
+
+Builds one job per (university, photo, prompt variant), drives GeminiFrameService with a bounded
+worker pool and the backend's shared Gemini rate limiter, uploads results to the R2 bucket in
+parallel and checkpoints every job in a local SQLite file, so a killed run resumes where it stopped.
+
+Run with the backend's environment (.env, requirements):
+
+    cd apps/backend
+    python ../scripts/bulk_generate.py --images ../scripts/photos --prompts ../../docs/prompt-v1.json \\
+        --limit 50 --workers 4 --rpm 30
+
+Universities come from the `Universities` table (DATABASE_URL / UNIV_DB_PATH). The table has no
+mascot column, so mascots are read from --mascots (CSV: name,mascot) when given and otherwise
+left to the model ("its official mascot").
+
+Prompt variant files are JSON prompt specs (see docs/nano-banana-prompt-guide.md). String values
+must use {university_name} and {university_mascot} (or {mascot}) for everything school-specific
+(colors, mascot, motto); files missing either placeholder are rejected. Empty files are skipped.
+Without --prompts the service's built-in prompt is used (variant "default").
+
+Results go to `_generated/bulk/<variant>/<university_id>/<photo stem>.<ext>` in the bucket, uploaded
+straight from memory. When an upload fails the image is saved to --output-dir and the checkpoint
+remembers it, so the retry uploads that copy instead of calling Gemini again.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import mimetypes
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from dotenv import load_dotenv
+load_dotenv(BACKEND_DIR / ".env")
+
+from app.services.database import database
+from app.services.gemini_frame_service import GeminiAPIError, GeminiFrameService, GeneratedImage
+from app.services.r2_client import public_url_for_key, upload_fileobj
+from app.services.rate_limiter import gemini_rate_limiter
+from app.services.repository import universities_repo
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+BULK_PREFIX = "_generated/bulk"
+# Upstream errors worth retrying (rate limit / overload); anything else fails the job right away
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+CHECKPOINT_DDL = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_key TEXT PRIMARY KEY,
+        university_id INTEGER NOT NULL,
+        university_name TEXT NOT NULL,
+        mascot TEXT NOT NULL,
+        image_path TEXT NOT NULL,
+        variant TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',   -- pending | done | failed
+        attempts INTEGER NOT NULL DEFAULT 0,
+        r2_key TEXT,
+        r2_url TEXT,
+        bytes INTEGER,
+        generate_ms REAL,
+        local_path TEXT,                          -- generated image kept on disk (--keep-local / failed upload)
+        error TEXT,
+        updated_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+"""
+
+
+# ---------- inputs ----------
+def load_mascots(path: Optional[str]) -> Dict[str, str]:
+    if not path:
+        return {}
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row[0].strip().lower(): row[1].strip() for row in csv.reader(f) if len(row) >= 2 and row[0].strip()}
+
+
+def load_universities(limit: Optional[int], name_like: Optional[str]) -> List[Tuple[int, str]]:
+    pairs = database.run_sync(universities_repo.id_name_pairs())
+    if name_like:
+        needle = name_like.lower()
+        pairs = [p for p in pairs if needle in p[1].lower()]
+    return pairs[:limit] if limit else pairs
+
+
+def load_images(paths: List[str]) -> List[Path]:
+    images: List[Path] = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            images.extend(sorted(f for f in p.iterdir() if f.suffix.lower() in IMAGE_EXTS))
+        elif p.suffix.lower() in IMAGE_EXTS:
+            images.append(p)
+    return images
+
+
+# Placeholders every prompt spec must reference ({mascot} is an alias of {university_mascot})
+PROMPT_PLACEHOLDERS = {
+    "{university_name}": ("{university_name}",),
+    "{university_mascot}": ("{university_mascot}", "{mascot}"),
+}
+
+
+def load_prompt_variants(paths: List[str]) -> Dict[str, Optional[dict]]:
+    """variant name -> JSON spec (None = the service's built-in prompt)"""
+    if not paths:
+        return {"default": None}
+    variants: Dict[str, Optional[dict]] = {}
+    for p in map(Path, paths):
+        text = p.read_text(encoding="utf-8").strip()
+        if not text:
+            print(f"Skipping empty prompt file: {p}")
+            continue
+        spec = json.loads(text)
+        # A spec written for one school (hard-coded colors/mascot) would brand every university with it
+        missing = [k for k, names in PROMPT_PLACEHOLDERS.items() if not any(n in text for n in names)]
+        if missing:
+            raise SystemExit(f"Prompt file {p} does not reference {', '.join(missing)}; "
+                             "university-specific details must come from the placeholders")
+        variants[p.stem] = spec
+    if not variants:
+        raise SystemExit("No usable prompt variants")
+    return variants
+
+
+def render_prompt(spec: dict, university_name: str, mascot: str) -> str:
+    def fill(value: Any) -> Any:
+        if isinstance(value, str):
+            for name in PROMPT_PLACEHOLDERS["{university_name}"]:
+                value = value.replace(name, university_name)
+            for name in PROMPT_PLACEHOLDERS["{university_mascot}"]:
+                value = value.replace(name, mascot)
+            return value
+        if isinstance(value, list):
+            return [fill(v) for v in value]
+        if isinstance(value, dict):
+            return {k: fill(v) for k, v in value.items()}
+        return value
+    return (
+        "Create a circular banner frame around the face in this photo to make it suitable as a social media "
+        f"profile picture for {university_name} (mascot: {mascot}). Do not obstruct or crop the face.\n"
+        "Follow this design specification:\n"
+        + json.dumps(fill(spec), ensure_ascii=False, indent=2)
+    )
+
+
+# ---------- checkpoint ----------
+def open_checkpoint(path: str) -> sqlite3.Connection:
+    con = sqlite3.connect(path)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(CHECKPOINT_DDL)
+    # Checkpoints written before local_path existed
+    if "local_path" not in {row["name"] for row in con.execute("PRAGMA table_info(jobs)")}:
+        con.execute("ALTER TABLE jobs ADD COLUMN local_path TEXT")
+    return con
+
+
+def seed_jobs(con: sqlite3.Connection, universities: List[Tuple[int, str]], mascots: Dict[str, str],
+              images: List[Path], variants: Dict[str, Optional[dict]]) -> int:
+    rows = []
+    for uid, name in universities:
+        mascot = mascots.get(name.lower(), "its official mascot")
+        for image in images:
+            for variant in variants:
+                key = f"{uid}|{image.resolve()}|{variant}"
+                rows.append((key, uid, name, mascot, str(image.resolve()), variant))
+    before = con.total_changes
+    con.executemany("""
+        INSERT OR IGNORE INTO jobs (job_key, university_id, university_name, mascot, image_path, variant)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    con.commit()
+    return con.total_changes - before
+
+
+def runnable_jobs(con: sqlite3.Connection, max_attempts: int, retry_failed: bool) -> Iterator[sqlite3.Row]:
+    # attempts counts failed runs only, so pending jobs (never run, or interrupted) always stay runnable
+    where = "status = 'pending'"
+    params: Tuple[Any, ...] = ()
+    if retry_failed:
+        where += " OR (status = 'failed' AND attempts < ?)"
+        params = (max_attempts,)
+    yield from con.execute(
+        f"SELECT * FROM jobs WHERE {where} ORDER BY university_id, variant, image_path", params,
+    ).fetchall()
+
+
+def record(con: sqlite3.Connection, job_key: str, **fields) -> None:
+    fields["updated_at"] = time.time()
+    sets = ", ".join(f"{k}=?" for k in fields)
+    con.execute(f"UPDATE jobs SET {sets} WHERE job_key=?", (*fields.values(), job_key))
+    con.commit()
+
+
+# ---------- work ----------
+class Encoded:
+    """Each photo is read and base64-encoded once per run, not once per job"""
+
+    def __init__(self, service: GeminiFrameService):
+        self.service = service
+        self._cache: Dict[str, Tuple[str, str]] = {}
+
+    def get(self, path: str) -> Tuple[str, str]:
+        if path not in self._cache:
+            self._cache[path] = self.service.encode_image(path)
+        return self._cache[path]
+
+
+def generate(service: GeminiFrameService, encoded: Encoded, job: sqlite3.Row,
+             variants: Dict[str, Optional[dict]], retries: int) -> Dict[str, Any]:
+    spec = variants.get(job["variant"])
+    prompt = render_prompt(spec, job["university_name"], job["mascot"]) if spec else None
+    attempt = 0
+    while True:
+        attempt += 1
+        started = time.perf_counter()
+        try:
+            image = service.generate_frame(
+                job["image_path"], job["university_name"], job["mascot"],
+                encoded=encoded.get(job["image_path"]), prompt=prompt,
+            )
+        except GeminiAPIError as e:
+            # 429 already paused the shared limiter; other retryable codes back off exponentially
+            if e.code in RETRYABLE_CODES and attempt <= retries:
+                if e.code != 429:
+                    time.sleep(min(60, 2 ** attempt))
+                continue
+            raise
+        if image is None:
+            raise RuntimeError("Gemini returned no image")
+        return {"image": image, "generate_ms": (time.perf_counter() - started) * 1000, "tries": attempt}
+
+
+def load_local(path: str) -> GeneratedImage:
+    """An image saved by an earlier run (GeneratedImage.save_to names it <sha256>.<ext>)"""
+    data = Path(path).read_bytes()
+    mime_type = mimetypes.guess_type(path)[0] or "image/jpeg"
+    return GeneratedImage(data, mime_type, hashlib.sha256(data).hexdigest())
+
+
+def upload(job: sqlite3.Row, image: GeneratedImage) -> Dict[str, Any]:
+    key = f"{BULK_PREFIX}/{job['variant']}/{job['university_id']}/{Path(job['image_path']).stem}.{image.ext}"
+    upload_fileobj(key, image.open(), image.mime_type, cache_control="public, max-age=31536000, immutable")
+    return {"r2_key": key, "r2_url": public_url_for_key(key), "bytes": image.size}
+
+
+def run(args) -> Dict[str, Any]:
+    if args.rpm is not None:
+        gemini_rate_limiter.configure(args.rpm)
+    universities = load_universities(args.limit, args.name_like)
+    images = load_images(args.images)
+    variants = load_prompt_variants(args.prompts)
+    if not images:
+        raise SystemExit("No input photos found (--images)")
+
+    con = open_checkpoint(args.checkpoint)
+    added = seed_jobs(con, universities, load_mascots(args.mascots), images, variants)
+    jobs = list(runnable_jobs(con, args.max_attempts, args.retry_failed))
+    counts = dict(con.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+    print(f"universities={len(universities)} photos={len(images)} variants={list(variants)} "
+          f"new_jobs={added} runnable={len(jobs)} checkpoint={counts}")
+    if args.dry_run or not jobs:
+        return {"runnable": len(jobs)}
+
+    # Results stay in memory (output_dir=None); only --keep-local and failed uploads are written to --output-dir
+    service = GeminiFrameService(output_dir=None, rate_limit_wait=None)
+    encoded = Encoded(service)
+    stats: Dict[str, Any] = {"done": 0, "failed": 0, "bytes": 0, "retries": 0}
+    generate_ms: List[float] = []
+    errors: Counter = Counter()
+    started = time.perf_counter()
+
+    gen_pool = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="generate")
+    up_pool = ThreadPoolExecutor(max_workers=args.upload_workers, thread_name_prefix="upload")
+    pending: Dict[Future, Tuple[str, sqlite3.Row, Optional[GeneratedImage]]] = {}
+    # job_key -> local copy written during this run (the job rows are read once, at the start)
+    local_paths: Dict[str, str] = {}
+    queue = iter(jobs)
+
+    def queued(kind: str) -> int:
+        return sum(1 for k, _, _ in pending.values() if k == kind)
+
+    def fill() -> None:
+        # Keep both pools busy without materializing a future per job
+        while queued("generate") < args.workers * 2 and queued("upload") < args.upload_workers * 2:
+            job = next(queue, None)
+            if job is None:
+                return
+            if job["local_path"] and os.path.exists(job["local_path"]):
+                # Generated by an earlier run whose upload failed: upload that copy, don't pay Gemini again
+                image = load_local(job["local_path"])
+                pending[up_pool.submit(upload, job, image)] = ("upload", job, image)
+                continue
+            pending[gen_pool.submit(generate, service, encoded, job, variants, args.retries)] = ("generate", job, None)
+
+    def keep(job: sqlite3.Row, image: GeneratedImage) -> Optional[str]:
+        try:
+            path = local_paths[job["job_key"]] = image.save_to(args.output_dir)
+        except OSError as e:
+            print(f"Could not save {job['university_name']} / {job['variant']} locally: {e}")
+            return None
+        record(con, job["job_key"], local_path=path)
+        return path
+
+    def fail(job: sqlite3.Row, e: Exception) -> None:
+        stats["failed"] += 1
+        errors[f"{type(e).__name__}: {getattr(e, 'code', '')}".rstrip(": ")] += 1
+        # Counted here, not when the job is queued: queued jobs dropped by Ctrl-C never ran
+        record(con, job["job_key"], status="failed", attempts=job["attempts"] + 1, error=str(e)[:500])
+        print(f"FAILED {job['university_name']} / {Path(job['image_path']).name} / {job['variant']}: {e}")
+
+    try:
+        fill()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                kind, job, image = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    if kind == "upload" and job["job_key"] not in local_paths and not job["local_path"]:
+                        # The image is paid for; keep it so the retry only has to upload it
+                        keep(job, image)
+                    fail(job, e)
+                    continue
+                if kind == "generate":
+                    image = result["image"]
+                    generate_ms.append(result["generate_ms"])
+                    stats["retries"] += result["tries"] - 1
+                    record(con, job["job_key"], generate_ms=round(result["generate_ms"], 1))
+                    if args.keep_local:
+                        keep(job, image)
+                    pending[up_pool.submit(upload, job, image)] = ("upload", job, image)
+                else:
+                    stats["done"] += 1
+                    stats["bytes"] += result["bytes"]
+                    local_path = local_paths.pop(job["job_key"], None) or job["local_path"]
+                    if local_path and not args.keep_local:
+                        if os.path.exists(local_path):
+                            os.remove(local_path)
+                        local_path = None
+                    record(con, job["job_key"], status="done", error=None, local_path=local_path, **result)
+                    total = stats["done"] + stats["failed"]
+                    if total % args.progress_every == 0:
+                        rate = total / (time.perf_counter() - started) * 60
+                        print(f"[{total}/{len(jobs)}] done={stats['done']} failed={stats['failed']} {rate:.1f} jobs/min")
+            fill()
+    except KeyboardInterrupt:
+        # Unfinished jobs stay 'pending' in the checkpoint and run again next time
+        print("Interrupted; waiting for in-flight uploads, the rest resumes on the next run")
+        gen_pool.shutdown(wait=False, cancel_futures=True)
+        up_pool.shutdown(wait=True)
+        raise
+    finally:
+        gen_pool.shutdown(wait=True)
+        up_pool.shutdown(wait=True)
+
+    elapsed = time.perf_counter() - started
+    processed = stats["done"] + stats["failed"]
+    return {
+        "jobs": len(jobs),
+        **stats,
+        "elapsed_s": round(elapsed, 1),
+        "throughput_per_min": round(processed / elapsed * 60, 2) if elapsed else None,
+        "failure_rate": round(stats["failed"] / processed, 4) if processed else None,
+        "generate_ms_p50": round(statistics.median(generate_ms), 1) if generate_ms else None,
+        "generate_ms_p95": round(statistics.quantiles(generate_ms, n=20)[-1], 1) if len(generate_ms) > 1 else None,
+        "errors": dict(errors.most_common(10)),
+        "rate_limiter": gemini_rate_limiter.info(),
+        "checkpoint": dict(con.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Pre-generate university frames offline with Gemini")
+    parser.add_argument("--images", nargs="+", required=True, help="photo files or directories")
+    parser.add_argument("--prompts", nargs="*", default=[], help="prompt variant JSON files (e.g. docs/prompt-v1.json)")
+    parser.add_argument("--mascots", default=None, help="CSV with 'university name,mascot' rows")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N universities (by id)")
+    parser.add_argument("--name-like", default=None, help="only universities whose name contains this text")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent Gemini generations")
+    parser.add_argument("--upload-workers", type=int, default=8, help="concurrent bucket uploads")
+    parser.add_argument("--rpm", type=float, default=None, help="Gemini requests per minute (default: GEMINI_RATE_LIMIT_RPM)")
+    parser.add_argument("--retries", type=int, default=3, help="retries per job for 429/5xx responses")
+    parser.add_argument("--max-attempts", type=int, default=3, help="failed runs after which --retry-failed leaves a job alone")
+    parser.add_argument("--retry-failed", action="store_true", help="also rerun jobs that failed in earlier runs")
+    parser.add_argument("--checkpoint", default="bulk_generate.db", help="SQLite checkpoint file")
+    parser.add_argument("--output-dir", default="outputs/bulk",
+                        help="where generated images are saved when an upload fails (and with --keep-local)")
+    parser.add_argument("--keep-local", action="store_true", help="also save every generated image to --output-dir")
+    parser.add_argument("--progress-every", type=int, default=10)
+    parser.add_argument("--dry-run", action="store_true", help="seed the checkpoint and print the job count only")
+    args = parser.parse_args(argv)
+
+    summary = run(args)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
-def main():
-    print("Hello from scripts!")
+from bulk_generate import main
 
 
 if __name__ == "__main__":